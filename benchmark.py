@@ -0,0 +1,300 @@
+#!/bin/python3
+
+##### Importing Modules #####
+### Builtin Modules ###
+import gc
+import sys
+import json
+import time
+import random
+import timeit
+import argparse
+import tracemalloc
+import platform
+import subprocess
+### Third Party Modules ###
+try:
+    import numpy
+except ImportError:
+    numpy = None
+### Package Modules ###
+import genetic
+import genetic_prog
+import selection
+import test
+
+##### Constants #####
+FULL_SWEEP = {"population_sizes": [100, 1000, 10000],
+              "chromosome_lengths": [10, 100, 1000],
+              "tree_depths": [3, 5, 7]}
+QUICK_SWEEP = {"population_sizes": [100, 1000],
+               "chromosome_lengths": [10, 100],
+               "tree_depths": [3, 5]}
+POINTS = [(x, 3 * x + 2) for x in range(0, 50)]
+
+##### Functions #####
+### Timing Functions ###
+def measure(func, repeat = 3):
+    """Return the best time of one call of func, in seconds.
+
+    Usage:
+    measure(func[, repeat])
+
+    Parameters:
+    func -- A function taking no arguments.
+    repeat -- The number of timing runs to take the best of. Defaults to 3.
+    """
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    best = elapsed / number
+    for i in range(1, repeat):
+        best = min(best, timer.timeit(number) / number)
+    return best
+
+def record(results, name, params, seconds, unit = "call", memory = None):
+    result = {"name": name, "params": params, "seconds": seconds,
+              "per_second": 1 / seconds if seconds > 0 else None, "unit": unit}
+    if memory is not None:
+        result["memory"] = memory
+    results.append(result)
+
+def measure_memory(func):
+    """Return the seconds one call of func took and a dictionary of its memory use.
+
+    The dictionary holds the peak traced memory above the starting point in
+    bytes, the net number of memory blocks left allocated and the number of
+    garbage collections run during the call.
+
+    Usage:
+    measure_memory(func)
+
+    Parameters:
+    func -- A function taking no arguments.
+    """
+    gc.collect()
+    collections = sum(generation["collections"] for generation in gc.get_stats())
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] - start_memory
+    tracemalloc.stop()
+    memory = {"peak_bytes": peak, "blocks": sys.getallocatedblocks() - blocks,
+              "gc_collections": sum(generation["collections"] for generation in gc.get_stats()) - collections}
+    return seconds, memory
+
+### Genetic Algorithm Benchmarks ###
+def bench_ga_operators(results, sweep):
+    for length in sweep["chromosome_lengths"]:
+        random.seed(0)
+        params = {"length": length}
+        parent1 = genetic.Individual(length, 100, sum)
+        parent2 = genetic.Individual(length, 100, sum)
+        record(results, "ga.crossover", params, measure(lambda: parent1.crossover(parent2, evaluate = False)))
+        record(results, "ga.mutate", params, measure(lambda: parent1.mutate(0.05)))
+        record(results, "ga.fitness.sum", params, measure(lambda: sum(parent1.chromosome)))
+
+def bench_ga_fitness(results, sweep):
+    random.seed(0)
+    fit_points = test.FitPoints(POINTS)
+    chromosome = [3, 2]
+    record(results, "ga.fitness.fitpoints", {"points": len(POINTS)},
+           measure(lambda: fit_points.sum_of_squares(chromosome)))
+    if numpy is not None:
+        vector_points = test.VectorFitPoints(POINTS)
+        for n_individuals in sweep["population_sizes"]:
+            chromosomes = numpy.random.randint(0, 10, size = (n_individuals, 2))
+            record(results, "ga.fitness.fitpoints_batch", {"points": len(POINTS), "population": n_individuals},
+                   measure(lambda: vector_points.sum_of_squares(chromosomes)), "generation")
+
+def bench_selection(results, sweep):
+    strategies = {"tournament": selection.Tournament(), "linear_rank": selection.LinearRank(),
+                  "sus": selection.StochasticUniversal()}
+    for n_individuals in sweep["population_sizes"]:
+        random.seed(0)
+        fitnesses = [random.random() for i in range(0, n_individuals)]
+        params = {"population": n_individuals}
+        for name, strategy in strategies.items():
+            record(results, "selection." + name, params,
+                   measure(lambda: strategy.select(fitnesses, False, n_individuals)), "generation")
+        individuals = [genetic.NewIndividual([0], 1, sum, fitness) for fitness in fitnesses]
+        record(results, "selection.best", params,
+               measure(lambda: selection.best(individuals, n_individuals // 10)), "generation")
+
+def bench_ga_generations(results, sweep):
+    population_classes = [genetic.Population]
+    if numpy is not None:
+        population_classes.append(genetic.ArrayPopulation)
+    for population_class in population_classes:
+        for n_individuals in sweep["population_sizes"]:
+            for length in sweep["chromosome_lengths"]:
+                random.seed(0)
+                if numpy is not None:
+                    numpy.random.seed(0)
+                population = population_class(n_individuals, length, 100, sum)
+                params = {"engine": population_class.__name__, "population": n_individuals, "length": length}
+                record(results, "ga.generation", params,
+                       measure(lambda: population.new_population(0.2), repeat = 1), "generation")
+    fit_points = test.FitPoints(POINTS)
+    for n_individuals in sweep["population_sizes"]:
+        random.seed(0)
+        population = genetic.Population(n_individuals, 2, 10, fit_points.sum_of_squares)
+        params = {"engine": "Population", "population": n_individuals, "workload": "fitpoints"}
+        record(results, "ga.generation", params,
+               measure(lambda: population.new_population(0.2), repeat = 1), "generation")
+        if numpy is not None:
+            vector_points = test.VectorFitPoints(POINTS)
+            population = genetic.ArrayPopulation(n_individuals, 2, 10, vector_points.sum_of_squares,
+                                                 batch_fitness = True)
+            params = {"engine": "ArrayPopulation", "population": n_individuals, "workload": "fitpoints_batch"}
+            record(results, "ga.generation", params,
+                   measure(lambda: population.new_population(0.2), repeat = 1), "generation")
+
+def bench_ga_memory(results, sweep):
+    # Population is the engine before the compact individuals, CompactPopulation the one after.
+    for population_class in (genetic.Population, genetic.CompactPopulation):
+        for n_individuals in sweep["population_sizes"]:
+            random.seed(0)
+            population = population_class(n_individuals, 100, 100, sum)
+            params = {"engine": population_class.__name__, "population": n_individuals, "length": 100}
+            seconds, memory = measure_memory(lambda: genetic.generations(5, population, 0.2))
+            record(results, "ga.memory", params, seconds / 5, "generation", memory)
+
+def bench_ga_delta(results, sweep):
+    # The same converged run with and without the fitness function's delta method.
+    random.seed(0)
+    target_distance = test.TargetDistance([random.randint(0, 100) for i in range(0, 1000)])
+    for name, fitness_func in (("delta", target_distance), ("full", target_distance.__call__)):
+        for n_individuals in sweep["population_sizes"][:2]:
+            random.seed(0)
+            population = genetic.generations(20, genetic.Population(n_individuals, 1000, 100, fitness_func), 0.2,
+                                             mutation_percent = 0.001)
+            params = {"population": n_individuals, "length": 1000, "evaluation": name}
+            record(results, "ga.generation.delta", params,
+                   measure(lambda: population.new_population(0.2, mutation_percent = 0.001), repeat = 1),
+                   "generation")
+
+### Genetic Programming Benchmarks ###
+def bench_gp_operators(results, sweep):
+    for depth in sweep["tree_depths"]:
+        random.seed(0)
+        params = {"depth": depth}
+        parent1 = genetic_prog.Individual(depth)
+        parent2 = genetic_prog.Individual(depth)
+        record(results, "gp.crossover", params, measure(lambda: parent1.crossover(parent2)))
+        record(results, "gp.mutate", params,
+               measure(lambda: genetic_prog.NewIndividual(parent1.tree).mutate(0.05)))
+        record(results, "gp.prune", params,
+               measure(lambda: genetic_prog.NewIndividual(parent1.tree).prune(0.05)))
+        record(results, "gp.insert", params,
+               measure(lambda: genetic_prog.NewIndividual(parent1.tree).insert(0.05, 3)))
+        record(results, "gp.fitness", params, measure(lambda: genetic_prog.fitness(parent1.tree)))
+        flat1 = genetic_prog.FlatTree.from_tree(parent1.tree)
+        flat2 = genetic_prog.FlatTree.from_tree(parent2.tree)
+        record(results, "gp.flat.crossover", params, measure(lambda: flat1.crossover(flat2)))
+        record(results, "gp.flat.fitness", params, measure(lambda: genetic_prog.fitness(flat1)))
+
+def bench_gp_generations(results, sweep):
+    for n_individuals in sweep["population_sizes"]:
+        for depth in sweep["tree_depths"]:
+            for flat in (False, True):
+                random.seed(0)
+                population = genetic_prog.Population(n_individuals, depth, flat = flat)
+                population.eval(genetic_prog.fitness)
+                params = {"population": n_individuals, "depth": depth, "flat": flat}
+
+                def generation():
+                    genetic_prog.NewPopulation(n_individuals, list(population.individuals)).new_population(
+                        0.2).eval(genetic_prog.fitness)
+                record(results, "gp.generation", params, measure(generation, repeat = 1), "generation")
+
+### Suite Functions ###
+BENCHMARKS = [bench_ga_operators, bench_ga_fitness, bench_selection, bench_ga_generations, bench_ga_memory, bench_ga_delta,
+              bench_gp_operators, bench_gp_generations]
+
+def run(quick = False, only = None):
+    """Run the benchmark suite and return its results as a dictionary.
+
+    Usage:
+    run([quick, only])
+
+    Parameters:
+    quick -- A boolean, if true run a smaller sweep. Defaults to false.
+    only -- A substring; only benchmark functions whose name contains it are run. Defaults to running all.
+    """
+    sweep = QUICK_SWEEP if quick else FULL_SWEEP
+    results = []
+    for benchmark in BENCHMARKS:
+        if only is None or only in benchmark.__name__:
+            benchmark(results, sweep)
+    return {"meta": metadata(quick), "results": results}
+
+def metadata(quick):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output = True, text = True,
+                                check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+            "numpy": numpy.__version__ if numpy is not None else None, "quick": quick,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def result_key(result):
+    params = ",".join(key + "=" + str(value) for key, value in sorted(result["params"].items()))
+    return result["name"] + "[" + params + "]"
+
+def compare(baseline, current, threshold = 0.1):
+    """Return a list of (key, baseline seconds, current seconds) for every regressed benchmark.
+
+    Usage:
+    compare(baseline, current[, threshold])
+
+    Parameters:
+    baseline -- A results dictionary returned by run, or loaded from its JSON output.
+    current -- A results dictionary returned by run.
+    threshold -- The relative slowdown treated as a regression. Defaults to 0.1.
+    """
+    baseline_times = {result_key(result): result["seconds"] for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        key = result_key(result)
+        if key in baseline_times and result["seconds"] > baseline_times[key] * (1 + threshold):
+            regressions.append((key, baseline_times[key], result["seconds"]))
+    return regressions
+
+def report(results):
+    lines = []
+    for result in results["results"]:
+        line = "{0:<70} {1:>12.3e} s/{2}".format(result_key(result), result["seconds"], result["unit"])
+        if "memory" in result:
+            line += "  peak {peak_bytes} B, {blocks} blocks, {gc_collections} gc".format(**result["memory"])
+        lines.append(line)
+    return "\n".join(lines)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Benchmark the genetic and genetic_prog engines.")
+    parser.add_argument("--quick", action = "store_true", help = "run a smaller sweep")
+    parser.add_argument("--only", help = "run only benchmark functions whose name contains this")
+    parser.add_argument("--output", help = "write the results as JSON to this file")
+    parser.add_argument("--compare", help = "a JSON results file to check for regressions against")
+    parser.add_argument("--threshold", type = float, default = 0.1,
+                        help = "relative slowdown reported as a regression (default 0.1)")
+    args = parser.parse_args(argv)
+    results = run(args.quick, args.only)
+    print(report(results))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent = 1)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(json.load(baseline_file), results, args.threshold)
+        for key, before, after in regressions:
+            print("REGRESSION {0}: {1:.3e} s -> {2:.3e} s".format(key, before, after))
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
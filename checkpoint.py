@@ -0,0 +1,203 @@
+#!/bin/python3
+
+##### Importing Modules #####
+### Builtin Modules ###
+import os
+import sys
+import json
+import mmap
+import array
+import random
+import struct
+### Third Party Modules ###
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+##### Constants #####
+# A checkpoint file is MAGIC, the length of a JSON header as a little-endian
+# unsigned 64 bit integer, the header itself, then the raw little-endian arrays
+# the header describes. Every array starts on an ALIGNMENT byte boundary so it
+# can be used in place from a memory map.
+MAGIC = b"PYGACKPT"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_LENGTH = struct.Struct("<Q")
+_TYPECODES = {"<i4": "i", "<i8": "q", "<u4": "I", "<u8": "Q", "<f8": "d"}
+_DTYPES = {array.array(typecode).typecode: dtype for dtype, typecode in _TYPECODES.items()}
+
+##### Classes #####
+### Checkpoint Class ###
+class Checkpoint(object):
+    """Class to read a checkpoint file through a memory map.
+
+    Arrays are not read until they are asked for. With numpy they are returned
+    as read-only views of the map, so loading costs no copy of the data.
+
+    Provides the following public methods:
+    array -- Return an array stored in the checkpoint.
+    values -- Return an array stored in the checkpoint as a flat list.
+    restore_random_state -- Set the random number generators to their saved state.
+
+    Provides the following public attributes:
+    header -- A dictionary with the metadata stored in the checkpoint.
+    generation -- The number of generations evolved when the checkpoint was written.
+    state -- A dictionary with the caller's extra loop state.
+    """
+    def __init__(self, path):
+        """Open a checkpoint file.
+
+        Usage:
+        __init__(path)
+
+        Parameters:
+        path -- The path of a file written by save.
+        """
+        with open(path, "rb") as checkpoint_file:
+            self._map = mmap.mmap(checkpoint_file.fileno(), 0, access = mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(path + " is not a checkpoint file")
+        header_start = len(MAGIC) + _LENGTH.size
+        header_length, = _LENGTH.unpack_from(self._map, len(MAGIC))
+        self.header = json.loads(self._map[header_start:header_start + header_length].decode("utf-8"))
+        if self.header["format"] != FORMAT_VERSION:
+            raise ValueError("unsupported checkpoint format " + str(self.header["format"]))
+        self._data_start = _aligned(header_start + header_length)
+        self.generation = self.header.get("generation", 0)
+        self.state = self.header.get("state", {})
+
+    def array(self, name):
+        """Return an array stored in the checkpoint.
+
+        With numpy this is a read-only array of the saved shape; without it, a
+        flat array.array.
+
+        Usage:
+        array(name)
+
+        Parameters:
+        name -- The name the array was saved under.
+        """
+        layout = self.header["arrays"][name]
+        start = self._data_start + layout["offset"]
+        count = 1
+        for dimension in layout["shape"]:
+            count *= dimension
+        if numpy is not None:
+            return numpy.frombuffer(self._map, dtype = layout["dtype"], count = count,
+                                    offset = start).reshape(layout["shape"])
+        values = array.array(_TYPECODES[layout["dtype"]])
+        values.frombytes(self._map[start:start + count * values.itemsize])
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    def values(self, name):
+        """Return an array stored in the checkpoint as a flat list.
+
+        Usage:
+        values(name)
+
+        Parameters:
+        name -- The name the array was saved under.
+        """
+        values = self.array(name)
+        if numpy is not None:
+            values = values.reshape(-1)
+        return values.tolist()
+
+    def restore_random_state(self):
+        """Set the random and numpy.random generators to their saved state."""
+        saved = self.header["random"]
+        random.setstate((saved["version"], tuple(self.values("random_state")), saved["gauss"]))
+        saved = self.header.get("numpy_random")
+        if saved is not None and numpy is not None:
+            numpy.random.set_state((saved["name"], numpy.array(self.array("numpy_random_state")), saved["pos"],
+                                    saved["has_gauss"], saved["cached_gaussian"]))
+
+##### Functions #####
+### Checkpoint Functions ###
+def save(path, header, arrays):
+    """Write a checkpoint file, along with the state of the random number generators.
+
+    The file is written next to path and then renamed over it, so a job stopped
+    while saving leaves the previous checkpoint intact.
+
+    Usage:
+    save(path, header, arrays)
+
+    Parameters:
+    path -- The path of the file to write.
+    header -- A dictionary of JSON serializable metadata. numpy scalars and arrays in it are stored as Python numbers and lists.
+    arrays -- A dictionary mapping names to numpy arrays or array.arrays of fixed-size numbers.
+    """
+    header = dict(header)
+    arrays = dict(arrays)
+    random_header, random_arrays = _random_state()
+    header.update(random_header)
+    arrays.update(random_arrays)
+    layout = {}
+    chunks = []
+    offset = 0
+    for name, values in arrays.items():
+        dtype, shape, data = _encode(values)
+        layout[name] = {"dtype": dtype, "shape": shape, "offset": offset}
+        chunks.append(data)
+        chunks.append(bytes(_aligned(len(data)) - len(data)))
+        offset += _aligned(len(data))
+    header["format"] = FORMAT_VERSION
+    header["arrays"] = layout
+    encoded = json.dumps(header, default = _json_default).encode("utf-8")
+    prefix = MAGIC + _LENGTH.pack(len(encoded)) + encoded
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as checkpoint_file:
+        checkpoint_file.write(prefix)
+        checkpoint_file.write(bytes(_aligned(len(prefix)) - len(prefix)))
+        for chunk in chunks:
+            checkpoint_file.write(chunk)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temporary_path, path)
+
+def load(path):
+    """Return a Checkpoint reading the file at path.
+
+    Usage:
+    load(path)
+
+    Parameters:
+    path -- The path of a file written by save.
+    """
+    return Checkpoint(path)
+
+def _json_default(value):
+    # numpy scalars, e.g. the best fitness a stopping criterion kept from a batch
+    # fitness function returning an integer array, are saved as Python numbers.
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError("Object of type " + type(value).__name__ + " is not JSON serializable")
+
+def _aligned(position):
+    return position + (-position % ALIGNMENT)
+
+def _encode(values):
+    if isinstance(values, array.array):
+        if sys.byteorder == "big":
+            values = array.array(values.typecode, values)
+            values.byteswap()
+        return _DTYPES[values.typecode], [len(values)], values.tobytes()
+    values = numpy.ascontiguousarray(values)
+    values = values.astype(values.dtype.newbyteorder("<"), copy = False)
+    return values.dtype.str, list(values.shape), values.tobytes()
+
+def _random_state():
+    version, internal_state, gauss = random.getstate()
+    header = {"random": {"version": version, "gauss": gauss}}
+    arrays = {"random_state": array.array("q", internal_state)}
+    if numpy is not None:
+        name, keys, position, has_gauss, cached_gaussian = numpy.random.get_state()
+        header["numpy_random"] = {"name": name, "pos": int(position), "has_gauss": int(has_gauss),
+                                  "cached_gaussian": float(cached_gaussian)}
+        arrays["numpy_random_state"] = keys
+    return header, arrays
@@ -0,0 +1,448 @@
+#!/bin/python3
+
+##### Importing Modules #####
+### Builtin Modules ###
+import os
+import math
+import asyncio
+import collections
+import concurrent.futures
+
+##### Classes #####
+### Evaluator Classes ###
+## Serial Evaluator Class ##
+class Evaluator(object):
+    """Class to evaluate a fitness function serially in the current process.
+
+    Provides the following public methods:
+    map -- Apply a fitness function to a sequence of items.
+    close -- Release the resources held by the evaluator.
+
+    Provides the following public attributes:
+    timed_out -- The positions, among the items of the last map call, whose fitness is a penalty rather than a result, and must not be cached.
+
+    This class can be used as a context manager, which calls close on exit.
+    """
+    timed_out = ()
+
+    def map(self, fitness_func, items, batch_fitness = False):
+        """Apply a fitness function to a sequence of items.
+
+        Usage:
+        map(fitness_func, items[, batch_fitness])
+
+        Parameters:
+        fitness_func -- A function that takes an item and returns its fitness.
+        items -- A sequence of items (chromosomes or trees) to evaluate.
+        batch_fitness -- A boolean, if true fitness_func takes a slice of items and returns their fitnesses. Defaults to false.
+        """
+        return _apply(fitness_func, items, batch_fitness)
+
+    def close(self):
+        """Release the resources held by the evaluator."""
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+## Pool Evaluator Class ##
+class PoolEvaluator(Evaluator):
+    """Class to evaluate a fitness function in parallel on a pool of workers.
+
+    The pool is created on first use and reused by every later call, so passing
+    the same evaluator to each generation only starts the workers once. Results
+    are returned in the order of the items, so a seeded run gives the same result
+    as a serial one.
+
+    Provides all public methods of the Evaluator class.
+
+    Provides the following public attributes:
+    workers -- The number of workers in the pool.
+    chunksize -- The number of items sent to a worker at a time, or None to pick one per call.
+    threads -- A boolean, true if the pool uses threads instead of processes.
+    """
+    def __init__(self, workers = None, chunksize = None, threads = False):
+        """Initialize the evaluator.
+
+        Usage:
+        __init__([workers, chunksize, threads])
+
+        Parameters:
+        workers -- The number of workers to use. Defaults to the number of CPUs.
+        chunksize -- The number of items sent to a worker at a time. Defaults to about four chunks per worker.
+        threads -- A boolean, if true use a thread pool, for fitness functions that release the GIL. Defaults to false.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.threads = threads
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.threads:
+                self._executor = concurrent.futures.ThreadPoolExecutor(max_workers = self.workers)
+            else:
+                self._executor = concurrent.futures.ProcessPoolExecutor(max_workers = self.workers)
+        return self._executor
+
+    def map(self, fitness_func, items, batch_fitness = False):
+        n_items = len(items)
+        if n_items == 0:
+            return []
+        chunksize = self.chunksize or max(1, math.ceil(n_items / (4 * self.workers)))
+        executor = self._get_executor()
+        futures = [executor.submit(_apply, fitness_func, items[start:start + chunksize], batch_fitness)
+                   for start in range(0, n_items, chunksize)]
+        fitnesses = []
+        for future in futures:
+            fitnesses.extend(future.result())
+        return fitnesses
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __getstate__(self):
+        # Executors cannot be pickled; a copy sent to another process starts its own pool.
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        return state
+
+## Async Evaluator Class ##
+class AsyncEvaluator(Evaluator):
+    """Class to evaluate a coroutine fitness function concurrently on an event loop.
+
+    For fitness functions that spend their time waiting, e.g. on a simulation
+    service, every item of a call is evaluated at once, up to concurrency calls
+    in flight. A call running longer than timeout is cancelled and its item gets
+    the penalty fitness instead. Results are returned in the order of the items.
+
+    Used from synchronous code, e.g. by genetic.evolve, the evaluator runs the
+    calls on an event loop of its own. genetic.evolve_async and
+    genetic.generations_async instead set loop to the running event loop and
+    breed in a worker thread, so the calls run on the caller's loop and the loop
+    is never blocked.
+
+    Provides all public methods of the Evaluator class.
+
+    Provides the following public attributes:
+    concurrency -- The maximum number of fitness function calls in flight.
+    timeout -- The seconds a call may run before it is cancelled, or None for no limit.
+    penalty -- The fitness given to an item whose call timed out.
+    timeouts -- The number of calls that have timed out.
+    timed_out -- The positions, among the items of the last map call, whose call timed out.
+    loop -- The event loop the calls are run on when map is called from another thread, or None.
+    """
+    def __init__(self, concurrency = 10, timeout = None, penalty = math.inf, loop = None):
+        """Initialize the evaluator.
+
+        Usage:
+        __init__([concurrency, timeout, penalty, loop])
+
+        Parameters:
+        concurrency -- The maximum number of fitness function calls in flight. Defaults to 10.
+        timeout -- The seconds a call may run before it is cancelled. Defaults to no limit.
+        penalty -- The fitness given to an item whose call timed out; use -math.inf when maximizing. Defaults to math.inf.
+        loop -- A running event loop to run the calls on from other threads. Defaults to a private event loop.
+        """
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.penalty = penalty
+        self.timeouts = 0
+        self.timed_out = []
+        self.loop = loop
+        self._loop = None
+
+    def map(self, fitness_func, items, batch_fitness = False):
+        """Apply a coroutine fitness function to a sequence of items.
+
+        Usage:
+        map(fitness_func, items[, batch_fitness])
+
+        Parameters:
+        fitness_func -- A coroutine function that takes an item and returns its fitness.
+        items -- A sequence of items (chromosomes or trees) to evaluate.
+        batch_fitness -- A boolean, if true fitness_func takes all the items and returns their fitnesses, in one call subject to timeout. Defaults to false.
+        """
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not None:
+            raise RuntimeError("AsyncEvaluator.map would block the running event loop; "
+                               "use genetic.evolve_async or genetic.generations_async")
+        coroutine = _evaluate_async(fitness_func, items, batch_fitness, self.concurrency, self.timeout, self.penalty)
+        if self.loop is not None and self.loop.is_running():
+            fitnesses, timed_out = asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+        else:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+            fitnesses, timed_out = self._loop.run_until_complete(coroutine)
+        self.timed_out = timed_out
+        self.timeouts += len(timed_out)
+        return fitnesses
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+
+    def __getstate__(self):
+        # Event loops cannot be pickled; a copy sent to another process runs its own.
+        state = self.__dict__.copy()
+        state["loop"] = state["_loop"] = None
+        return state
+
+### Cache Classes ###
+## Fitness Cache Class ##
+class FitnessCache(object):
+    """Class to remember the fitness of recently evaluated chromosomes.
+
+    Entries are keyed on the chromosome's contents and the least recently used
+    entry is evicted once the cache is full. The fitness function must be
+    deterministic for the cached values to be valid.
+
+    Provides the following public methods:
+    get -- Return the cached fitness of a chromosome, or None.
+    put -- Store the fitness of a chromosome.
+    clear -- Remove every entry and reset the counters.
+    hit_rate -- The proportion of lookups that were answered from the cache.
+
+    Provides the following public attributes:
+    maxsize -- The maximum number of entries kept.
+    hits -- The number of lookups answered from the cache.
+    misses -- The number of lookups that needed an evaluation.
+    """
+    def __init__(self, maxsize = 100000):
+        """Initialize the cache.
+
+        Usage:
+        __init__([maxsize])
+
+        Parameters:
+        maxsize -- The maximum number of entries kept. Defaults to 100000.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def get(self, chromosome):
+        """Return the cached fitness of a chromosome, or None.
+
+        Usage:
+        get(chromosome)
+
+        Parameters:
+        chromosome -- A list or array of genes.
+        """
+        return self._lookup(_key(chromosome))
+
+    def put(self, chromosome, fitness):
+        """Store the fitness of a chromosome.
+
+        Usage:
+        put(chromosome, fitness)
+
+        Parameters:
+        chromosome -- A list or array of genes.
+        fitness -- The fitness of the chromosome.
+        """
+        self._store(_key(chromosome), fitness)
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self):
+        """Return the proportion of lookups that were answered from the cache."""
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / lookups
+
+    def _lookup(self, key):
+        fitness = self._entries.get(key)
+        if fitness is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return fitness
+
+    def _store(self, key, fitness):
+        self._entries[key] = fitness
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last = False)
+
+    def __len__(self):
+        return len(self._entries)
+
+## Subtree Cache Class ##
+class SubtreeCache(FitnessCache):
+    """Class to remember the values of recently evaluated subtrees of genetic programs.
+
+    Entries are keyed on a subtree and a token naming the dataset it was
+    evaluated on, and the least recently used entry is evicted once the cache
+    is full. Subtrees are compared by identity, which for the hash-consed
+    genetic_prog.BinaryTree nodes is structural equality, and hashed with the
+    structural hash each node computes once. A copy sent to another process
+    starts empty.
+
+    Provides the following public methods:
+    get -- Return the cached value of a subtree on a dataset, or None.
+    put -- Store the value of a subtree on a dataset.
+    clear -- Remove every entry and reset the counters.
+    hit_rate -- The proportion of lookups that were answered from the cache.
+
+    Provides the following public attributes:
+    maxsize -- The maximum number of entries kept.
+    hits -- The number of lookups answered from the cache.
+    misses -- The number of lookups that needed an evaluation.
+    """
+    def __init__(self, maxsize = 10000):
+        """Initialize the cache.
+
+        Usage:
+        __init__([maxsize])
+
+        Parameters:
+        maxsize -- The maximum number of entries kept. Defaults to 10000.
+        """
+        FitnessCache.__init__(self, maxsize)
+
+    def get(self, subtree, dataset = None):
+        """Return the cached value of a subtree on a dataset, or None.
+
+        Usage:
+        get(subtree[, dataset])
+
+        Parameters:
+        subtree -- A genetic_prog.BinaryTree.
+        dataset -- A hashable token naming the dataset. Defaults to None.
+        """
+        return self._lookup((subtree, dataset))
+
+    def put(self, subtree, dataset, value):
+        """Store the value of a subtree on a dataset.
+
+        Usage:
+        put(subtree, dataset, value)
+
+        Parameters:
+        subtree -- A genetic_prog.BinaryTree.
+        dataset -- A hashable token naming the dataset.
+        value -- The value of the subtree, a number or an array of one value per data point.
+        """
+        self._store((subtree, dataset), value)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_entries"] = collections.OrderedDict()
+        return state
+
+##### Functions #####
+### Evaluation Functions ###
+def evaluate(fitness_func, items, batch_fitness = False, evaluator = None, cache = None):
+    """Return a list of the fitness of each item.
+
+    Usage:
+    evaluate(fitness_func, items[, batch_fitness, evaluator, cache])
+
+    Parameters:
+    fitness_func -- A function that takes an item and returns its fitness.
+    items -- A sequence of items (chromosomes or trees) to evaluate.
+    batch_fitness -- A boolean, if true fitness_func takes a sequence of items and returns their fitnesses. Defaults to false.
+    evaluator -- An Evaluator to run fitness_func with. Defaults to evaluating serially.
+    cache -- A FitnessCache consulted before, and filled after, evaluating. Defaults to no cache. Penalties given for timed out calls are not cached, so those items are evaluated again next time.
+    """
+    if evaluator is None:
+        evaluator = _SERIAL
+    if cache is None:
+        return evaluator.map(fitness_func, items, batch_fitness)
+    fitnesses = [None] * len(items)
+    missing = collections.OrderedDict()
+    for position, item in enumerate(items):
+        key = _key(item)
+        if key in missing:
+            # A duplicate of an item already queued for evaluation in this call.
+            missing[key].append(position)
+            cache.hits += 1
+            continue
+        fitness = cache._lookup(key)
+        if fitness is None:
+            missing[key] = [position]
+        else:
+            fitnesses[position] = fitness
+    if missing:
+        first_positions = [positions[0] for positions in missing.values()]
+        new_fitnesses = evaluator.map(fitness_func, _take(items, first_positions), batch_fitness)
+        timed_out = set(evaluator.timed_out)
+        for index, ((key, positions), fitness) in enumerate(zip(missing.items(), new_fitnesses)):
+            if index not in timed_out:
+                cache._store(key, fitness)
+            for position in positions:
+                fitnesses[position] = fitness
+    return fitnesses
+
+async def evaluate_async(fitness_func, items, batch_fitness = False, concurrency = 10, timeout = None,
+                         penalty = math.inf):
+    """Return a list of the fitness of each item, from a coroutine fitness function called concurrently.
+
+    Usage:
+    await evaluate_async(fitness_func, items[, batch_fitness, concurrency, timeout, penalty])
+
+    Parameters:
+    fitness_func -- A coroutine function that takes an item and returns its fitness.
+    items -- A sequence of items (chromosomes or trees) to evaluate.
+    batch_fitness -- A boolean, if true fitness_func takes all the items and returns their fitnesses. Defaults to false.
+    concurrency -- The maximum number of calls in flight. Defaults to 10.
+    timeout -- The seconds a call may run before it is cancelled. Defaults to no limit.
+    penalty -- The fitness given to an item whose call timed out. Defaults to math.inf.
+    """
+    fitnesses, timed_out = await _evaluate_async(fitness_func, items, batch_fitness, concurrency, timeout, penalty)
+    return fitnesses
+
+async def _evaluate_async(fitness_func, items, batch_fitness, concurrency, timeout, penalty):
+    # Returns the fitnesses and the sorted positions of the items whose call timed out.
+    if batch_fitness:
+        try:
+            return list(await asyncio.wait_for(fitness_func(items), timeout)), []
+        except asyncio.TimeoutError:
+            return [penalty] * len(items), list(range(0, len(items)))
+    semaphore = asyncio.Semaphore(concurrency)
+    timed_out = []
+
+    async def call(position, item):
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(fitness_func(item), timeout)
+            except asyncio.TimeoutError:
+                timed_out.append(position)
+                return penalty
+    fitnesses = await asyncio.gather(*[call(position, item) for position, item in enumerate(items)])
+    return fitnesses, sorted(timed_out)
+
+def _key(chromosome):
+    if hasattr(chromosome, "tobytes"):
+        return chromosome.tobytes()
+    return tuple(chromosome)
+
+def _take(items, positions):
+    if hasattr(items, "shape"):
+        return items[positions]
+    return [items[position] for position in positions]
+
+def _apply(fitness_func, items, batch_fitness):
+    if batch_fitness:
+        return list(fitness_func(items))
+    return [fitness_func(item) for item in items]
+
+_SERIAL = Evaluator()
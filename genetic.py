@@ -2,9 +2,24 @@
 
 ##### Importing Modules #####
 ### Builtin Modules ###
-import random
+import os
+import time
+import asyncio
+import array
 import math
+import itertools
 import collections.abc
+### Third Party Modules ###
+try:
+    import numpy
+except ImportError:
+    numpy = None
+### Package Modules ###
+import evaluation
+import selection
+import checkpoint
+import monitoring
+import randomness
 
 ##### Classes #####
 ### Population Classes ###
@@ -14,70 +29,182 @@ class Population(collections.abc.Sequence):
 
     Provides the following public methods:
     new_population -- Create the next generation's population.
+    diversity -- The proportion of distinct chromosomes in the population.
 
     Provides the following attributes:
     individuals -- A list containing the individuals in the population, sorted by fitness.
     n_individuals -- The number of individuals in the population.
     fittest -- The most fit individual.
-    avg_fitness -- The average fitness of the population.
+    avg_fitness -- The average fitness of the population, leaving out infinite and nan fitnesses such as timeout penalties.
     best_fitness -- The fitness of the fittest individual.
+    cache_hits -- The number of fitnesses creating this population took from the cache.
+    cache_misses -- The number of fitnesses creating this population had to evaluate with a cache in use.
+    evaluations -- The number of fitness function calls creating this population took.
+    duplicates -- The number of children bred as clones and mutated again when this population was bred with dedupe.
+    delta_evaluations -- The number of fitnesses creating this population updated with the fitness function's delta method.
+    timings -- A dictionary with the seconds spent breeding ("breed") and evaluating ("evaluate") this population.
+    rng -- The randomness.RNG, or randomness.GLOBAL, every random number of the population and its descendants is drawn from.
 
     This class provides the methods to be used as a sequence.
     """
-    def __init__(self, n_individuals, individual_length, gene_max, fitness_func, maximize = False):
+    def __init__(self, n_individuals, individual_length, gene_max, fitness_func, maximize = False,
+                 batch_fitness = False, evaluator = None, cache = None, rng = None):
         """Initialize the population.
 
         Usage:
-        __init__(n_individuals, individual_length, gene_max, fitness_func[, maximize])
+        __init__(n_individuals, individual_length, gene_max, fitness_func[, maximize, batch_fitness, evaluator, cache, rng])
 
         Parameters:
         n_individuals -- The number of individuals in the population.
         individual_length -- The length of an individual's chromosome.
         gene_max -- The maximum value for any spot in an individual's chromosome.
-        fitness_func -- A function that takes a chromosome and returns its fitness.
+        fitness_func -- A function that takes a chromosome and returns its fitness. If it has a delta method, children are re-evaluated from a parent's fitness (see _evaluate).
         maximize -- A boolean to control whether to maximize or minimize the fitness function. Defaults to false.
+        batch_fitness -- A boolean, if true fitness_func takes a list of chromosomes and returns a sequence of their fitnesses. Defaults to false.
+        evaluator -- An evaluation.Evaluator used to compute fitnesses, e.g. a PoolEvaluator. Defaults to serial evaluation.
+        cache -- An evaluation.FitnessCache shared by every generation. Defaults to no cache.
+        rng -- A randomness.RNG to draw every random number from. Defaults to the global random module.
         """
-        self.individuals = [Individual(individual_length, gene_max, fitness_func) for i in range(0, n_individuals)]
+        self.rng = randomness.resolve(rng)
+        self.individuals = [Individual(individual_length, gene_max, fitness_func, evaluate = False, rng = self.rng)
+                            for i in range(0, n_individuals)]
         self.maximize = maximize
+        self.batch_fitness = batch_fitness
+        self.evaluator = evaluator
+        self.cache = cache
         self._finish_init(n_individuals)
         
     def _finish_init(self, n_individuals):
         self.n_individuals = n_individuals
-        self.individuals.sort(reverse = self.maximize)
-        self.fittest = self.individuals[0]
-        self.best_fitness = self.individuals[0].fitness
+        self.duplicates = 0
+        start = time.perf_counter()
+        self._evaluate(self._individuals)
+        self.timings = {"breed": 0.0, "evaluate": time.perf_counter() - start}
+        if self.maximize:
+            self.fittest = max(self._individuals)
+        else:
+            self.fittest = min(self._individuals)
+        self.best_fitness = self.fittest.fitness
         self.avg_fitness = self._calc_avg_fitness()
 
+    # The individuals are only sorted when they are first read in order, since
+    # breeding the next generation needs just the best few (see selection.best).
+    @property
+    def individuals(self):
+        if not self._sorted:
+            self._individuals.sort(reverse = self.maximize)
+            self._sorted = True
+        return self._individuals
+
+    @individuals.setter
+    def individuals(self, individuals):
+        self._individuals = individuals
+        self._sorted = False
+        self._index = None
+
     def _calc_avg_fitness(self):
         sum = 0
-        for individual in self.individuals:
+        for individual in self._individuals:
             sum += individual.fitness
-        return sum / self.n_individuals
+        if sum - sum == 0:
+            return sum / self.n_individuals
+        # Some fitness is infinite or nan, e.g. the penalty of a timed out evaluation.
+        return monitoring.mean([individual.fitness for individual in self._individuals])
+
+    def _evaluate(self, individuals):
+        # Individuals are created unevaluated so their fitness can be computed after
+        # mutation, and so a batch fitness function sees the whole generation at once.
+        # Preserved parents already carry their fitness and are skipped.
+        #
+        # A fitness function that is decomposable over genes may provide
+        # delta(chromosome, parent_chromosome, parent_fitness, positions), which
+        # returns the fitness of chromosome given that it only differs from
+        # parent_chromosome, of fitness parent_fitness, at the listed positions.
+        # Crossover and mutation record those positions, and children that
+        # differ from their first parent in few enough genes are updated with
+        # delta instead of being evaluated in full.
+        self.cache_hits = self.cache_misses = 0
+        self.delta_evaluations = 0
+        pending = [individual for individual in individuals if individual.fitness is None]
+        if pending and hasattr(pending[0].fitness_func, "delta"):
+            full = []
+            for individual in pending:
+                fitness = _delta_fitness(individual)
+                if fitness is None:
+                    full.append(individual)
+                else:
+                    individual.fitness = fitness
+            self.delta_evaluations = len(pending) - len(full)
+            pending = full
+        self.evaluations = len(pending)
+        if not pending:
+            return
+        if self.cache is not None:
+            hits, misses = self.cache.hits, self.cache.misses
+        fitnesses = evaluation.evaluate(pending[0].fitness_func, [individual.chromosome for individual in pending],
+                                        self.batch_fitness, self.evaluator, self.cache)
+        for individual, fitness in zip(pending, fitnesses):
+            individual.fitness = fitness
+            individual._parent = individual._changed = None
+        if self.cache is not None:
+            self.cache_hits = self.cache.hits - hits
+            self.cache_misses = self.cache.misses - misses
+            self.evaluations = self.cache_misses
+
+    def diversity(self):
+        """Return the proportion of distinct chromosomes in the population."""
+        distinct = set(tuple(individual.chromosome) for individual in self._individuals)
+        return len(distinct) / self.n_individuals
     
-    def new_population(self, preserve_percent, non_optimal = 0, mutation_percent = .05):
+    def new_population(self, preserve_percent, non_optimal = 0, mutation_percent = .05, strategy = None,
+                       dedupe = False):
         """Create the next generation's population.
 
         Usage:
-        new_population(preserve_percent[, non_optimal, mutation_percent])
+        new_population(preserve_percent[, non_optimal, mutation_percent, strategy, dedupe])
         
         Parameters:
         preserve_percent -- The proportion of best performing individuals to use as the parents.
         non_optimal -- The proportion of randomly selected individuals to use as parents. Defaults to 0.
         mutation_percent -- The probability of a location on a chromosome mutating. Defaults to 0.05.
+        strategy -- A selection strategy such as selection.Tournament, used to pick the parents of each child from the whole population; its select method is given the population's rng. Defaults to picking uniformly from the preserved parents.
+        dedupe -- A boolean, if true a child identical to a parent or an earlier child is mutated again, so evaluations are not spent on clones. Defaults to false.
         """
+        start = time.perf_counter()
+        rng = self.rng
         n_parents = math.floor(self.n_individuals * preserve_percent)
         n_non_optimal = math.floor(self.n_individuals * non_optimal)
-        parents = self.individuals[:n_parents]
+        if self._sorted:
+            parents = self._individuals[:n_parents]
+        else:
+            parents = selection.best(self._individuals, n_parents, self.maximize)
         for i in range(0, n_non_optimal):
-            parents.append(random.choice(self.individuals))
+            parents.append(rng.choice(self._individuals))
         next_gen_individuals = parents.copy()
-        while len(next_gen_individuals) < self.n_individuals:
-            parent1 = random.choice(parents)
-            parent2 = random.choice(parents)
-            child = parent1.crossover(parent2)
-            child.mutate(mutation_percent)
+        n_children = max(self.n_individuals - len(next_gen_individuals), 0)
+        if strategy is None:
+            mothers = [rng.choice(parents) for i in range(0, n_children)]
+            fathers = [rng.choice(parents) for i in range(0, n_children)]
+        else:
+            fitnesses = [individual.fitness for individual in self._individuals]
+            chosen = [self._individuals[index]
+                      for index in strategy.select(fitnesses, self.maximize, 2 * n_children, rng = rng)]
+            mothers, fathers = chosen[:n_children], chosen[n_children:]
+        duplicates = 0
+        if dedupe:
+            seen = set(tuple(parent.chromosome) for parent in parents)
+        for parent1, parent2 in zip(mothers, fathers):
+            child = parent1.crossover(parent2, evaluate = False, rng = rng)
+            child.mutate(mutation_percent, rng)
+            if dedupe:
+                duplicates += _make_unique(child, seen, mutation_percent, rng)
             next_gen_individuals.append(child)
-        return New_Population(self.n_individuals, next_gen_individuals, maximize)
+        breed_time = time.perf_counter() - start
+        next_generation = New_Population(self.n_individuals, next_gen_individuals, self.maximize,
+                                         self.batch_fitness, self.evaluator, self.cache, rng)
+        next_generation.timings["breed"] = breed_time
+        next_generation.duplicates = duplicates
+        return next_generation
 
     # Container emulation methods
     def __getitem__(self, index):
@@ -91,12 +218,10 @@ class Population(collections.abc.Sequence):
             yield item
 
     def __contains__(self, individual):
-        matched = False
-        for indiv in self.individuals:
-            if individual == indiv:
-                matched = True
-                break
-        return matched
+        # The index is built on the first test, after which each test is a hash lookup.
+        if self._index is None:
+            self._index = set(self._individuals)
+        return individual in self._index
 
 ## New Population Class ##    
 class New_Population(Population):
@@ -104,20 +229,437 @@ class New_Population(Population):
 
     Provides all public methods and attributes of the Population class.
     """
-    def __init__(self, n_individuals, individuals, maximize):
+    def __init__(self, n_individuals, individuals, maximize, batch_fitness = False, evaluator = None,
+                 cache = None, rng = None):
         """Initialize a population from a list of individuals.
 
         Usage:
-        __init__(n_individuals, individuals)
+        __init__(n_individuals, individuals, maximize[, batch_fitness, evaluator, cache, rng])
 
         Parameters:
         n_individuals -- The number of individuals in the population.
-        individuals -- A list of individuals.
+        individuals -- A list of individuals. Individuals without a fitness are evaluated.
+        maximize -- A boolean to control whether to maximize or minimize the fitness function.
+        batch_fitness -- A boolean, if true the fitness function takes a list of chromosomes. Defaults to false.
+        evaluator -- An evaluation.Evaluator used to compute fitnesses. Defaults to serial evaluation.
+        cache -- An evaluation.FitnessCache shared by every generation. Defaults to no cache.
+        rng -- A randomness.RNG to draw every random number from. Defaults to the global random module.
         """
         self.individuals = individuals
         self.maximize = maximize
+        self.batch_fitness = batch_fitness
+        self.evaluator = evaluator
+        self.cache = cache
+        self.rng = randomness.resolve(rng)
+        self._finish_init(n_individuals)
+
+## Compact Population Class ##
+class CompactPopulation(Population):
+    """Class to create a population of CompactIndividuals that reuses its storage between generations.
+
+    Every individual shares the population's Config, and breeding writes the
+    next generation into the individuals and chromosome lists of the generation
+    before this one, so after the first two generations the loop allocates no
+    new individuals or chromosomes. Only the current and the previous generation
+    stay valid: keep the fittest individual or copy the chromosomes of an older
+    generation before breeding from the one after it.
+
+    Provides all public methods and attributes of the Population class.
+
+    Provides the following public attributes:
+    config -- The Config shared by the individuals of the population.
+    """
+    def __init__(self, n_individuals, individual_length, gene_max, fitness_func, maximize = False,
+                 batch_fitness = False, evaluator = None, cache = None, rng = None):
+        """Initialize the population.
+
+        Usage:
+        __init__(n_individuals, individual_length, gene_max, fitness_func[, maximize, batch_fitness, evaluator, cache, rng])
+
+        Parameters:
+        n_individuals -- The number of individuals in the population.
+        individual_length -- The length of an individual's chromosome.
+        gene_max -- The maximum value for any spot in an individual's chromosome.
+        fitness_func -- A function that takes a chromosome and returns its fitness.
+        maximize -- A boolean to control whether to maximize or minimize the fitness function. Defaults to false.
+        batch_fitness -- A boolean, if true fitness_func takes a list of chromosomes and returns a sequence of their fitnesses. Defaults to false.
+        evaluator -- An evaluation.Evaluator used to compute fitnesses. Defaults to serial evaluation.
+        cache -- An evaluation.FitnessCache shared by every generation. Defaults to no cache.
+        rng -- A randomness.RNG to draw every random number from. Defaults to the global random module.
+        """
+        self.rng = randomness.resolve(rng)
+        self.config = Config(gene_max, individual_length, fitness_func)
+        self.individuals = [CompactIndividual(self.rng.randints(0, gene_max, individual_length), self.config)
+                            for i in range(0, n_individuals)]
+        self.maximize = maximize
+        self.batch_fitness = batch_fitness
+        self.evaluator = evaluator
+        self.cache = cache
+        self._spare = None
         self._finish_init(n_individuals)
 
+    def new_population(self, preserve_percent, non_optimal = 0, mutation_percent = .05, strategy = None,
+                       dedupe = False):
+        """Create the next generation's population, reusing the storage of the previous generation.
+
+        Usage:
+        new_population(preserve_percent[, non_optimal, mutation_percent, strategy, dedupe])
+
+        Parameters:
+        preserve_percent -- The proportion of best performing individuals to use as the parents.
+        non_optimal -- The proportion of randomly selected individuals to use as parents. Defaults to 0.
+        mutation_percent -- The probability of a location on a chromosome mutating. Defaults to 0.05.
+        strategy -- A selection strategy such as selection.Tournament, used to pick the parents of each child from the whole population; its select method is given the population's rng. Defaults to picking uniformly from the preserved parents.
+        dedupe -- A boolean, if true a child identical to a parent or an earlier child is mutated again, so evaluations are not spent on clones. Defaults to false.
+        """
+        start = time.perf_counter()
+        rng = self.rng
+        n_parents = math.floor(self.n_individuals * preserve_percent)
+        n_non_optimal = math.floor(self.n_individuals * non_optimal)
+        if self._sorted:
+            parents = self._individuals[:n_parents]
+        else:
+            parents = selection.best(self._individuals, n_parents, self.maximize)
+        for i in range(0, n_non_optimal):
+            parents.append(rng.choice(self._individuals))
+        n_children = max(self.n_individuals - len(parents), 0)
+        if strategy is None:
+            mothers = [rng.choice(parents) for i in range(0, n_children)]
+            fathers = [rng.choice(parents) for i in range(0, n_children)]
+        else:
+            fitnesses = [individual.fitness for individual in self._individuals]
+            chosen = [self._individuals[index]
+                      for index in strategy.select(fitnesses, self.maximize, 2 * n_children, rng = rng)]
+            mothers, fathers = chosen[:n_children], chosen[n_children:]
+        buffer = self._spare
+        n_next = len(parents) + n_children
+        if buffer is None or len(buffer) != n_next:
+            buffer = [CompactIndividual([0] * self.config.length, self.config) for i in range(0, n_next)]
+        # Parents are copied rather than shared, so no individual of this
+        # generation is ever overwritten while the next one is bred from it.
+        index = 0
+        for parent in parents:
+            parent.copy_into(buffer[index])
+            index += 1
+        duplicates = 0
+        if dedupe:
+            seen = set(tuple(parent.chromosome) for parent in parents)
+        for parent1, parent2 in zip(mothers, fathers):
+            child = buffer[index]
+            parent1.crossover_into(parent2, child, rng)
+            child.mutate(mutation_percent, rng)
+            if dedupe:
+                duplicates += _make_unique(child, seen, mutation_percent, rng)
+            index += 1
+        breed_time = time.perf_counter() - start
+        next_generation = New_CompactPopulation(self.n_individuals, buffer, self.config, self.maximize,
+                                                self.batch_fitness, self.evaluator, self.cache, self._individuals,
+                                                rng)
+        next_generation.timings["breed"] = breed_time
+        next_generation.duplicates = duplicates
+        return next_generation
+
+## New Compact Population Class ##
+class New_CompactPopulation(CompactPopulation):
+    """Class to create a compact population from a list of compact individuals.
+
+    Provides all public methods and attributes of the CompactPopulation class.
+    """
+    def __init__(self, n_individuals, individuals, config, maximize, batch_fitness = False, evaluator = None,
+                 cache = None, spare = None, rng = None):
+        """Initialize a compact population from a list of compact individuals.
+
+        Usage:
+        __init__(n_individuals, individuals, config, maximize[, batch_fitness, evaluator, cache, spare, rng])
+
+        Parameters:
+        n_individuals -- The number of individuals in the population.
+        individuals -- A list of CompactIndividuals sharing config. Individuals without a fitness are evaluated.
+        config -- The Config shared by the individuals.
+        maximize -- A boolean to control whether to maximize or minimize the fitness function.
+        batch_fitness -- A boolean, if true the fitness function takes a list of chromosomes. Defaults to false.
+        evaluator -- An evaluation.Evaluator used to compute fitnesses. Defaults to serial evaluation.
+        cache -- An evaluation.FitnessCache shared by every generation. Defaults to no cache.
+        spare -- A list of CompactIndividuals the next generation may be written into. Defaults to allocating new ones.
+        rng -- A randomness.RNG to draw every random number from. Defaults to the global random module.
+        """
+        self.rng = randomness.resolve(rng)
+        self.config = config
+        self.individuals = individuals
+        self.maximize = maximize
+        self.batch_fitness = batch_fitness
+        self.evaluator = evaluator
+        self.cache = cache
+        self._spare = spare
+        self._finish_init(n_individuals)
+
+## Array Population Class ##
+class ArrayPopulation(collections.abc.Sequence):
+    """Class to create a population whose chromosomes are stored in a single array.
+
+    Every chromosome is one row of a two-dimensional integer array, so crossover,
+    mutation, parent selection and sorting are done for a whole generation at once
+    instead of gene by gene. Requires numpy.
+
+    Provides the following public methods:
+    new_population -- Create the next generation's population.
+    diversity -- The proportion of distinct chromosomes in the population.
+
+    Provides the following attributes:
+    chromosomes -- A 2-D array with one chromosome per row, sorted by fitness.
+    fitnesses -- An array with the fitness of each row of chromosomes.
+    individuals -- A list of individuals built from the rows of chromosomes.
+    n_individuals -- The number of individuals in the population.
+    fittest -- The most fit individual.
+    avg_fitness -- The average fitness of the population, leaving out infinite and nan fitnesses such as timeout penalties.
+    best_fitness -- The fitness of the fittest individual.
+    cache_hits -- The number of fitnesses creating this population took from the cache.
+    cache_misses -- The number of fitnesses creating this population had to evaluate with a cache in use.
+    evaluations -- The number of fitness function calls creating this population took.
+    duplicates -- The number of children bred as clones and mutated again when this population was bred with dedupe.
+    delta_evaluations -- The number of fitnesses creating this population updated with the fitness function's delta method.
+    timings -- A dictionary with the seconds spent breeding ("breed") and evaluating ("evaluate") this population.
+    rng -- The randomness.RNG, or randomness.GLOBAL, every random number of the population and its descendants is drawn from.
+
+    This class provides the methods to be used as a sequence.
+    """
+    def __init__(self, n_individuals, individual_length, gene_max, fitness_func, maximize = False,
+                 batch_fitness = False, evaluator = None, cache = None, rng = None):
+        """Initialize the population.
+
+        Usage:
+        __init__(n_individuals, individual_length, gene_max, fitness_func[, maximize, batch_fitness, evaluator, cache, rng])
+
+        Parameters:
+        n_individuals -- The number of individuals in the population.
+        individual_length -- The length of an individual's chromosome.
+        gene_max -- The maximum value for any spot in an individual's chromosome.
+        fitness_func -- A function that takes a chromosome and returns its fitness.
+        maximize -- A boolean to control whether to maximize or minimize the fitness function. Defaults to false.
+        batch_fitness -- A boolean, if true fitness_func takes the 2-D array of chromosomes and returns an array of their fitnesses. Defaults to false.
+        evaluator -- An evaluation.Evaluator used to compute fitnesses. Defaults to serial evaluation.
+        cache -- An evaluation.FitnessCache shared by every generation. Defaults to no cache.
+        rng -- A randomness.RNG to draw every random number from. Defaults to numpy.random and the random module.
+        """
+        if numpy is None:
+            raise ImportError("ArrayPopulation requires numpy")
+        self.rng = randomness.resolve(rng)
+        self.gene_max = gene_max
+        self.fitness_func = fitness_func
+        self.maximize = maximize
+        self.batch_fitness = batch_fitness
+        self.evaluator = evaluator
+        self.cache = cache
+        chromosomes = self.rng.integers(0, gene_max + 1, (n_individuals, individual_length), _gene_dtype(gene_max))
+        start = time.perf_counter()
+        fitnesses, self.cache_hits, self.cache_misses = self._evaluate(chromosomes)
+        evaluate_time = time.perf_counter() - start
+        self._finish_init(chromosomes, fitnesses)
+        self.timings["evaluate"] = evaluate_time
+        self.evaluations = self.cache_misses if cache is not None else n_individuals
+
+    def _finish_init(self, chromosomes, fitnesses):
+        self._chromosomes = chromosomes
+        self._fitnesses = fitnesses
+        self._sorted = False
+        self.n_individuals, self.length = chromosomes.shape
+        self._best = int(numpy.argmax(fitnesses) if self.maximize else numpy.argmin(fitnesses))
+        self.best_fitness = fitnesses[self._best].item()
+        self.avg_fitness = fitnesses.mean().item()
+        if not math.isfinite(self.avg_fitness):
+            kept = fitnesses[numpy.isfinite(fitnesses)]
+            if len(kept):
+                self.avg_fitness = kept.mean().item()
+        self.timings = {"breed": 0.0, "evaluate": 0.0}
+        self.evaluations = 0
+        self.duplicates = 0
+        self.delta_evaluations = 0
+        self._index = None
+
+    # The rows are only sorted when they are first read in order; breeding the
+    # next generation partitions out the best rows instead.
+    def _sort(self):
+        if not self._sorted:
+            order = numpy.argsort(self._ranking_keys(), kind = "stable")
+            self._chromosomes = self._chromosomes[order]
+            self._fitnesses = self._fitnesses[order]
+            self._index = None
+            self._best = 0
+            self._sorted = True
+
+    def _ranking_keys(self):
+        if self.maximize:
+            return -self._fitnesses
+        return self._fitnesses
+
+    def _best_rows(self, n_best):
+        if n_best <= 0:
+            return numpy.arange(0)
+        if self._sorted or n_best >= self.n_individuals:
+            self._sort()
+            return numpy.arange(min(n_best, self.n_individuals))
+        keys = self._ranking_keys()
+        rows = numpy.argpartition(keys, n_best - 1)[:n_best]
+        return rows[numpy.argsort(keys[rows], kind = "stable")]
+
+    @property
+    def chromosomes(self):
+        self._sort()
+        return self._chromosomes
+
+    @property
+    def fitnesses(self):
+        self._sort()
+        return self._fitnesses
+
+    def _evaluate(self, chromosomes):
+        if not self.batch_fitness:
+            chromosomes = chromosomes.tolist()
+        hits = misses = 0
+        if self.cache is not None:
+            hits, misses = self.cache.hits, self.cache.misses
+        fitnesses = evaluation.evaluate(self.fitness_func, chromosomes, self.batch_fitness, self.evaluator,
+                                        self.cache)
+        if self.cache is not None:
+            hits, misses = self.cache.hits - hits, self.cache.misses - misses
+        return numpy.array(fitnesses, dtype = float), hits, misses
+
+    @property
+    def fittest(self):
+        return NewIndividual(self._chromosomes[self._best].tolist(), self.gene_max, self.fitness_func,
+                             self.best_fitness)
+
+    def diversity(self):
+        """Return the proportion of distinct chromosomes in the population."""
+        return len(numpy.unique(self._chromosomes, axis = 0)) / self.n_individuals
+
+    @property
+    def individuals(self):
+        return [self[index] for index in range(0, self.n_individuals)]
+
+    def new_population(self, preserve_percent, non_optimal = 0, mutation_percent = .05, strategy = None,
+                       dedupe = False):
+        """Create the next generation's population.
+
+        Usage:
+        new_population(preserve_percent[, non_optimal, mutation_percent, strategy, dedupe])
+
+        Parameters:
+        preserve_percent -- The proportion of best performing individuals to use as the parents.
+        non_optimal -- The proportion of randomly selected individuals to use as parents. Defaults to 0.
+        mutation_percent -- The probability of a location on a chromosome mutating. Defaults to 0.05.
+        strategy -- A selection strategy such as selection.Tournament, used to pick the parents of each child from the whole population; its select method is given the population's rng. Defaults to picking uniformly from the preserved parents.
+        dedupe -- A boolean, if true a child identical to a parent or an earlier child is mutated again, so evaluations are not spent on clones. Defaults to false.
+        """
+        start = time.perf_counter()
+        rng = self.rng
+        n_parents = math.floor(self.n_individuals * preserve_percent)
+        n_non_optimal = math.floor(self.n_individuals * non_optimal)
+        parents = numpy.concatenate((self._best_rows(n_parents),
+                                     rng.integers(0, self.n_individuals, n_non_optimal)))
+        n_children = max(self.n_individuals - len(parents), 0)
+        if strategy is None:
+            mothers = parents[rng.integers(0, len(parents), n_children)]
+            fathers = parents[rng.integers(0, len(parents), n_children)]
+        else:
+            chosen = numpy.asarray(strategy.select(self._fitnesses.tolist(), self.maximize, 2 * n_children,
+                                                   rng = rng), dtype = numpy.intp)
+            mothers, fathers = chosen[:n_children], chosen[n_children:]
+        children = self._chromosomes[mothers]
+        from_father = rng.integers(0, 2, children.shape, bool)
+        children[from_father] = self._chromosomes[fathers][from_father]
+        mutations = _bernoulli_positions(children.size, mutation_percent, rng)
+        children.reshape(-1)[mutations] = rng.integers(0, self.gene_max + 1, len(mutations))
+        parent_chromosomes = self._chromosomes[parents]
+        duplicates = 0
+        if dedupe:
+            duplicates = self._make_unique(parent_chromosomes, children, mutation_percent)
+        chromosomes = numpy.concatenate((parent_chromosomes, children))
+        evaluate_start = time.perf_counter()
+        child_fitnesses, hits, misses = self._evaluate(children)
+        evaluate_end = time.perf_counter()
+        fitnesses = numpy.concatenate((self._fitnesses[parents], child_fitnesses))
+        next_generation = New_ArrayPopulation(chromosomes, fitnesses, self.gene_max, self.fitness_func,
+                                              self.maximize, self.batch_fitness, self.evaluator, self.cache, rng)
+        next_generation.cache_hits, next_generation.cache_misses = hits, misses
+        next_generation.evaluations = misses if self.cache is not None else n_children
+        next_generation.duplicates = duplicates
+        next_generation.timings = {"breed": (evaluate_start - start) + (time.perf_counter() - evaluate_end),
+                                   "evaluate": evaluate_end - evaluate_start}
+        return next_generation
+
+    # Container emulation methods
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.n_individuals))]
+        return NewIndividual(self.chromosomes[index].tolist(), self.gene_max, self.fitness_func,
+                             self.fitnesses[index].item())
+
+    def __len__(self):
+        return self.n_individuals
+
+    def __iter__(self):
+        for index in range(0, self.n_individuals):
+            yield self[index]
+
+    def __contains__(self, individual):
+        if len(individual) != self.length:
+            return False
+        if self._index is None:
+            self._index = set(zip((row.tobytes() for row in self._chromosomes), self._fitnesses.tolist()))
+        key = numpy.asarray(individual.chromosome, dtype = self._chromosomes.dtype).tobytes()
+        return (key, individual.fitness) in self._index
+
+    def _make_unique(self, parent_chromosomes, children, mutation_percent):
+        # Mutate again the children that repeat a parent or an earlier child, a
+        # few times at most, and return how many clones there were.
+        probability = max(mutation_percent, 1 / self.length) if self.length else 0
+        clones = _duplicate_rows(parent_chromosomes, children)
+        n_clones = len(clones)
+        for attempt in range(0, _DEDUPE_ATTEMPTS):
+            if not len(clones):
+                break
+            rows = children[clones]
+            mutations = _bernoulli_positions(rows.size, probability, self.rng)
+            rows.reshape(-1)[mutations] = self.rng.integers(0, self.gene_max + 1, len(mutations))
+            children[clones] = rows
+            clones = _duplicate_rows(parent_chromosomes, children)
+        return n_clones
+
+## New Array Population Class ##
+class New_ArrayPopulation(ArrayPopulation):
+    """Class to create an array population from an array of chromosomes.
+
+    Provides all public methods and attributes of the ArrayPopulation class.
+    """
+    def __init__(self, chromosomes, fitnesses, gene_max, fitness_func, maximize, batch_fitness = False,
+                 evaluator = None, cache = None, rng = None):
+        """Initialize an array population from an array of chromosomes.
+
+        Usage:
+        __init__(chromosomes, fitnesses, gene_max, fitness_func, maximize[, batch_fitness, evaluator, cache, rng])
+
+        Parameters:
+        chromosomes -- A 2-D array with one chromosome per row.
+        fitnesses -- An array with the fitness of each row of chromosomes.
+        gene_max -- The maximum value for any spot in an individual's chromosome.
+        fitness_func -- A function that takes a chromosome and returns its fitness.
+        maximize -- A boolean to control whether to maximize or minimize the fitness function.
+        batch_fitness -- A boolean, if true fitness_func takes the 2-D array of chromosomes. Defaults to false.
+        evaluator -- An evaluation.Evaluator used to compute fitnesses. Defaults to serial evaluation.
+        cache -- An evaluation.FitnessCache shared by every generation. Defaults to no cache.
+        rng -- A randomness.RNG to draw every random number from. Defaults to numpy.random and the random module.
+        """
+        self.rng = randomness.resolve(rng)
+        self.gene_max = gene_max
+        self.fitness_func = fitness_func
+        self.maximize = maximize
+        self.batch_fitness = batch_fitness
+        self.evaluator = evaluator
+        self.cache = cache
+        self.cache_hits = self.cache_misses = 0
+        self._finish_init(chromosomes, fitnesses)
+
 ### Individual Classes ###
 ## Basic Individual Class ##
 class Individual(collections.abc.Sequence):
@@ -136,56 +678,81 @@ class Individual(collections.abc.Sequence):
     
     This class provides the methods to be used as a sequence.
     """
-    def __init__(self, individual_length, gene_max, fitness_func):
+    def __init__(self, individual_length, gene_max, fitness_func, evaluate = True, rng = None):
         """Initialize an individual.
 
         Usage:
-        __init__(individual_length, gene_max, fitness_func)
+        __init__(individual_length, gene_max, fitness_func[, evaluate, rng])
 
         Parameters:
         individual_length -- The length of the chromosome of the individual.
         gene_max -- The maximum integer to use at any location along the chromosome.
         fitness_func -- A function that takes a chromosome and returns its fitness.
+        evaluate -- A boolean, if false the fitness is left as None for the population to compute. Defaults to true.
+        rng -- A randomness.RNG to draw the chromosome from. Defaults to the global random module.
         """
-        self.chromosome = [random.randint(0, gene_max) for i in range(0, individual_length)]
-        self._finish_init(individual_length, gene_max, fitness_func)
+        self.chromosome = randomness.resolve(rng).randints(0, gene_max, individual_length)
+        self._finish_init(individual_length, gene_max, fitness_func, evaluate = evaluate)
         
-    def _finish_init(self, individual_length, gene_max, fitness_func):
+    def _finish_init(self, individual_length, gene_max, fitness_func, fitness = None, evaluate = True):
         self.max = gene_max
         self.length = individual_length
         self.fitness_func = fitness_func
-        self.fitness = self.fitness_func(self.chromosome)
+        self._hash = None
+        self._parent = None
+        self._changed = None
+        if fitness is None and evaluate:
+            fitness = self.fitness_func(self.chromosome)
+        self.fitness = fitness
 
-    def mutate(self, probability):
+    def mutate(self, probability, rng = None):
         """Mutate the individual.
 
         Usage:
-        mutate(probability)
+        mutate(probability[, rng])
 
         Parameters:
         probability -- The probability that a given location on the chromosome will mutate.
+        rng -- A randomness.RNG to draw from. Defaults to the global random module.
         """
-        for index, item in enumerate(self.chromosome):
-            if random.random() < probability:
-                self.chromosome[index] = random.randint(0, self.max)
+        # One bulk draw decides which genes mutate, then each of those draws its new value.
+        rng = randomness.resolve(rng)
+        positions = rng.positions(len(self.chromosome), probability)
+        for index in positions:
+            self.chromosome[index] = rng.randint(0, self.max)
+        if self._changed is not None:
+            self._changed.extend(positions)
+        self._hash = None
 
-    def crossover(self, other):
+    def crossover(self, other, evaluate = True, rng = None):
         """Create a child from this individual and another one.
 
         Usage:
-        crossover(other)
+        crossover(other[, evaluate, rng])
 
         Parameters:
         other -- Another individual.
+        evaluate -- A boolean, if false the child's fitness is left as None. Defaults to true.
+        rng -- A randomness.RNG to draw from. Defaults to the global random module.
         """
-        chromosome = [0 for i in range(0, self.length)]
-        for index, gene in enumerate(self.chromosome):
-            num = random.random()
-            if num < .5:
-                chromosome[index] = gene
-            else:
+        rng = randomness.resolve(rng)
+        if self.fitness is not None and hasattr(self.fitness_func, "delta"):
+            # The same draws as pick, kept as positions to remember where the child differs
+            # from this parent, for the fitness function's delta.
+            taken = rng.positions(len(self.chromosome), .5)
+            chromosome = list(self.chromosome)
+            for index in taken:
                 chromosome[index] = other.chromosome[index]
-        return NewIndividual(chromosome, self.max, self.fitness_func)
+            child = NewIndividual(chromosome, self.max, self.fitness_func, evaluate = False)
+            child._parent = (self.chromosome, self.fitness)
+            child._changed = _changed_positions(self.chromosome, chromosome, taken)
+        else:
+            chromosome = rng.pick(self.chromosome, other.chromosome, .5)
+            child = NewIndividual(chromosome, self.max, self.fitness_func, evaluate = False)
+        if evaluate:
+            fitness = _delta_fitness(child)
+            child.fitness = self.fitness_func(chromosome) if fitness is None else fitness
+        return child
 
     # Container emulation methods
     def __getitem__(self, index):
@@ -201,16 +768,21 @@ class Individual(collections.abc.Sequence):
     def __contains__(self, item):
         return item in self.chromosome
 
-    # Methods to allow comparison (for sorting)
+    # Methods to allow hashing and comparison (for sets and sorting). The hash
+    # of the chromosome is cached, so the chromosome must only be changed
+    # through the methods of the individual.
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(tuple(self.chromosome))
+        return self._hash
+
     def __eq__(self, other):
-        identical_chromosomes = True
-        for index, item in self.chromosome:
-            if other[index] != item:
-                identical_chromosomes = False
-        if len(other) != self.length:
-            identical_chromosomes = False
+        if not isinstance(other, (Individual, CompactIndividual)):
+            return NotImplemented
+        if self._hash is not None and other._hash is not None and self._hash != other._hash:
+            return False
         return (self.max == other.max and self.fitness == other.fitness
-                                      and identical_chromosomes)
+                and list(self.chromosome) == list(other.chromosome))
 
     def __lt__(self, other):
         return self.fitness < other.fitness
@@ -225,7 +797,10 @@ class Individual(collections.abc.Sequence):
         return self.fitness >= other.fitness
 
     def __ne__(self, other):
-        return not self.__eq__(other)
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
 
 ## New Individual Class ##
 class NewIndividual(Individual):
@@ -233,28 +808,174 @@ class NewIndividual(Individual):
 
     Provides all the public methods and attributes of the Individual class.
     """
-    def __init__(self, chromosome, gene_max, fitness_func):
+    def __init__(self, chromosome, gene_max, fitness_func, fitness = None, evaluate = True):
         """Initialize a new individual from a given chromosome.
-        
+
         Usage:
-        __init__(chromosome, gene_max, fitness_func)
+        __init__(chromosome, gene_max, fitness_func[, fitness, evaluate])
 
         Parameters:
         chromosome -- A list of integers, this individual's chromosome.
         gene_max -- The maximum possible value of any location on the chromosome.
         fitness_func -- A function that takes a chromosome and returns its fitness.
+        fitness -- The already known fitness of the chromosome. Defaults to calling fitness_func.
+        evaluate -- A boolean, if false and no fitness is given the fitness is left as None. Defaults to true.
         """
         self.chromosome = chromosome
-        self._finish_init(len(self.chromosome), gene_max, fitness_func)
+        self._finish_init(len(self.chromosome), gene_max, fitness_func, fitness, evaluate)
+
+## Individual Configuration Class ##
+class Config(object):
+    """Class to hold the settings shared by every individual of a population.
+
+    Provides the following public attributes:
+    gene_max -- The maximum possible value of a location on a chromosome.
+    length -- The length of a chromosome.
+    fitness_func -- A function that takes a chromosome and returns its fitness.
+    """
+    __slots__ = ("gene_max", "length", "fitness_func")
+
+    def __init__(self, gene_max, length, fitness_func):
+        self.gene_max = gene_max
+        self.length = length
+        self.fitness_func = fitness_func
+
+## Compact Individual Class ##
+class CompactIndividual(collections.abc.Sequence):
+    """Class to create an individual without a __dict__, whose settings live in a shared Config.
+
+    An instance holds only its chromosome, its fitness and a reference to the
+    Config, which makes it several times smaller than an Individual.
+
+    Provides all the public methods and attributes of the Individual class, and the following public methods:
+    crossover_into -- Write a child of this individual and another one into an existing individual.
+    copy_into -- Copy this individual into an existing individual.
+
+    Provides the following public attributes:
+    config -- The Config shared with the rest of the population.
+    """
+    __slots__ = ("chromosome", "fitness", "config", "_hash", "_parent", "_changed")
+
+    def __init__(self, chromosome, config, fitness = None, evaluate = False):
+        """Initialize an individual from a given chromosome.
+
+        Usage:
+        __init__(chromosome, config[, fitness, evaluate])
+
+        Parameters:
+        chromosome -- A list of integers, this individual's chromosome.
+        config -- The Config shared by the population.
+        fitness -- The already known fitness of the chromosome. Defaults to None.
+        evaluate -- A boolean, if true and no fitness is given call the fitness function. Defaults to false.
+        """
+        self.chromosome = chromosome
+        self.config = config
+        self._hash = None
+        self._parent = None
+        self._changed = None
+        if fitness is None and evaluate:
+            fitness = config.fitness_func(chromosome)
+        self.fitness = fitness
+
+    @property
+    def max(self):
+        return self.config.gene_max
+
+    @property
+    def length(self):
+        return self.config.length
+
+    @property
+    def fitness_func(self):
+        return self.config.fitness_func
+
+    mutate = Individual.mutate
+
+    def crossover(self, other, evaluate = True, rng = None):
+        """Create a child from this individual and another one.
+
+        Usage:
+        crossover(other[, evaluate, rng])
+
+        Parameters:
+        other -- Another individual sharing this individual's config.
+        evaluate -- A boolean, if false the child's fitness is left as None. Defaults to true.
+        rng -- A randomness.RNG to draw from. Defaults to the global random module.
+        """
+        child = CompactIndividual([0] * self.config.length, self.config)
+        self.crossover_into(other, child, rng)
+        if evaluate:
+            fitness = _delta_fitness(child)
+            child.fitness = self.config.fitness_func(child.chromosome) if fitness is None else fitness
+        return child
+
+    def crossover_into(self, other, child, rng = None):
+        """Write a child of this individual and another one into an existing individual.
+
+        The child's chromosome list is overwritten in place and its fitness reset to None.
+
+        Usage:
+        crossover_into(other, child[, rng])
+
+        Parameters:
+        other -- Another individual of the same length.
+        child -- The individual to overwrite. It must not be this individual or other.
+        rng -- A randomness.RNG to draw from. Defaults to the global random module.
+        """
+        # This parent's genes are copied into the buffer, then the other parent's are
+        # written at the positions drawn for them, so nothing is allocated but the positions.
+        chromosome = child.chromosome
+        taken = randomness.resolve(rng).positions(len(self.chromosome), .5)
+        chromosome[:] = self.chromosome
+        for index in taken:
+            chromosome[index] = other.chromosome[index]
+        if self.fitness is not None and hasattr(self.config.fitness_func, "delta"):
+            # Remember where the child differs from this parent, for the fitness function's delta.
+            child._parent = (self.chromosome, self.fitness)
+            child._changed = _changed_positions(self.chromosome, chromosome, taken)
+        else:
+            child._parent = child._changed = None
+        child.fitness = None
+        child._hash = None
+
+    def copy_into(self, other):
+        """Copy this individual's chromosome and fitness into an existing individual.
+
+        Usage:
+        copy_into(other)
+
+        Parameters:
+        other -- The individual to overwrite.
+        """
+        other.chromosome[:] = self.chromosome
+        other.fitness = self.fitness
+        other._hash = self._hash
+        other._parent = other._changed = None
+
+    # Container emulation and comparison methods, shared with Individual
+    __getitem__ = Individual.__getitem__
+    __len__ = Individual.__len__
+    __iter__ = Individual.__iter__
+    __contains__ = Individual.__contains__
+    __hash__ = Individual.__hash__
+    __eq__ = Individual.__eq__
+    __lt__ = Individual.__lt__
+    __le__ = Individual.__le__
+    __gt__ = Individual.__gt__
+    __ge__ = Individual.__ge__
+    __ne__ = Individual.__ne__
 
 ##### Functions #####
 ### Evolve Function ###
 def evolve(n_individuals, individual_length, fitness_func, preserve_percent,
-           non_optimal = 0, mutation_percent = 0.05, gene_max = 100, maximize = False):
+           non_optimal = 0, mutation_percent = 0.05, gene_max = 100, maximize = False,
+           population_class = Population, batch_fitness = False, evaluator = None, cache = None,
+           strategy = None, checkpoint_path = None, checkpoint_interval = 10, resume = False, criteria = None,
+           rng = None):
     """Evolve a solution to a fitness function.
 
     Usage:
-    evolve(n_individuals, individual_length, fitness_func, preserve_percent[, non_optimal, mutation_percent, gene_max, maximize])
+    evolve(n_individuals, individual_length, fitness_func, preserve_percent[, non_optimal, mutation_percent, gene_max, maximize, population_class, batch_fitness, evaluator, cache, strategy, checkpoint_path, checkpoint_interval, resume, criteria, rng])
 
     Parameters:
     n_individuals -- The number of individuals in each generation.
@@ -265,23 +986,87 @@ def evolve(n_individuals, individual_length, fitness_func, preserve_percent,
     mutation_percent -- The probability of a given location on a chromosome mutating. Defaults to 0.05.
     gene_max -- The maximum value to use on any location of a chromosome. Defaults to 100.
     maximize -- A boolean to control wether to maximize or minimize the fitness function.
+    population_class -- The population class to evolve: Population, CompactPopulation or ArrayPopulation. Defaults to Population.
+    batch_fitness -- A boolean, if true fitness_func evaluates a whole generation's chromosomes in one call. Defaults to false.
+    evaluator -- An evaluation.Evaluator, e.g. a PoolEvaluator, reused for every generation. Defaults to serial evaluation.
+    cache -- An evaluation.FitnessCache used to skip re-evaluating known chromosomes. Defaults to no cache.
+    strategy -- A selection strategy from the selection module used to pick parents. Defaults to uniform choice among the preserved parents.
+    checkpoint_path -- A file to save the population to every checkpoint_interval generations. Defaults to no checkpoints.
+    checkpoint_interval -- The number of generations between checkpoints. Defaults to 10.
+    resume -- A boolean, if true and checkpoint_path exists continue the run saved there. Defaults to false.
+    criteria -- A list of stopping criteria from the monitoring module, or functions taking a snapshot and returning true to stop. Defaults to stopping once the average fitness no longer improves.
+    rng -- A randomness.RNG to draw every random number of the run from. Defaults to the global random module.
     """
-    generation = Population(n_individuals, individual_length, gene_max, fitness_func, maximize)
-    last_fitness = 0
-    next_fitness = generation.avg_fitness
-    while last_fitness < next_fitness:
-        generation = generation.new_population(preserve_percent, non_optimal, mutation_percent)
-        last_fitness = next_fitness
-        next_fitness = generation.avg_fitness
+    if criteria is None:
+        criteria = [monitoring.AverageStalls(maximize)]
+    n_generations = 0
+    if resume and checkpoint_path is not None and os.path.exists(checkpoint_path):
+        generation, n_generations, state = load_population(checkpoint_path, fitness_func, evaluator, cache)
+        if state.get("criteria") is not None:
+            monitoring.set_states(criteria, state["criteria"])
+    else:
+        generation = population_class(n_individuals, individual_length, gene_max, fitness_func, maximize,
+                                      batch_fitness, evaluator, cache, rng)
+    snapshots = stream(generation, preserve_percent, non_optimal, mutation_percent, strategy, n_generations)
+    for snapshot in snapshots:
+        # Saved before the criteria see the snapshot, so a resumed run feeds them the same one again.
+        if checkpoint_path is not None and snapshot.generation > n_generations \
+           and snapshot.generation % checkpoint_interval == 0:
+            save_population(checkpoint_path, snapshot.population, snapshot.generation,
+                            {"criteria": monitoring.get_states(criteria)})
+        if any([criterion(snapshot) for criterion in criteria]):
+            break
+    generation = snapshot.population
     print("Fittest individual has a fitness of " + str(generation.best_fitness))
     return generation.fittest
 
+### Stream Function ###
+def stream(population, preserve_percent, non_optimal = 0, mutation_percent = 0.05, strategy = None,
+           generation = 0):
+    """Yield a monitoring.Snapshot of a population and of each generation bred from it, without end.
+
+    Stop iterating to stop the run, for example with monitoring.until.
+
+    Usage:
+    stream(population, preserve_percent[, non_optimal, mutation_percent, strategy, generation])
+
+    Parameters:
+    population -- The population to start from.
+    preserve_percent -- The proportion of highest performing individuals to use as parents for the next generation.
+    non_optimal -- The proportion of randomly selected individuals to use as parents. Defaults to 0.
+    mutation_percent -- The probability of a mutation occurring at any given point along a chromosome. Defaults to 0.05.
+    strategy -- A selection strategy from the selection module used to pick parents. Defaults to uniform choice among the preserved parents.
+    generation -- The generation number of population. Defaults to 0.
+    """
+    start = time.perf_counter()
+    while True:
+        end = time.perf_counter()
+        yield _snapshot(generation, population, end - start)
+        start = time.perf_counter()
+        population = population.new_population(preserve_percent, non_optimal, mutation_percent, strategy)
+        generation += 1
+
+def _snapshot(generation, population, elapsed):
+    if isinstance(population, ArrayPopulation):
+        fitnesses = population._fitnesses
+        finite = numpy.isfinite(fitnesses)
+        if not finite.all():
+            fitnesses = fitnesses[finite]
+        std_fitness = fitnesses.std().item() if len(fitnesses) else 0.0
+    else:
+        std_fitness = monitoring.std([individual.fitness for individual in population._individuals],
+                                     population.avg_fitness)
+    return monitoring.Snapshot(generation, population.best_fitness, population.avg_fitness, std_fitness,
+                               None, population.evaluations, dict(population.timings),
+                               elapsed, population)
+
 ### Generations Function ###
-def generations(n_generations, population, preserve_percent, non_optimal = 0, mutation_percent = 0.05):
+def generations(n_generations, population, preserve_percent, non_optimal = 0, mutation_percent = 0.05,
+                strategy = None, checkpoint_path = None, checkpoint_interval = 10, resume = False):
     """Evolve a population for given number of generations.
 
     Usage:
-    generations(n_generations, population, preserve_percent[, non_optimal, mutation_percent, gene_max])
+    generations(n_generations, population, preserve_percent[, non_optimal, mutation_percent, strategy, checkpoint_path, checkpoint_interval, resume])
     
     Parameters:
     n_generations -- The number of generations to evolve for
@@ -289,7 +1074,225 @@ def generations(n_generations, population, preserve_percent, non_optimal = 0, mu
     preserve_percent -- The proportion of highest performing individuals to use as parents for the next generation.
     non_optimal -- The proportion of randomly selected individuals to use as parents. Defaults to 0.
     mutation_percent -- The probability of a mutation occurring at any given point along a chromosome. Defaults to 0.05.
+    strategy -- A selection strategy from the selection module used to pick parents. Defaults to uniform choice among the preserved parents.
+    checkpoint_path -- A file to save the population to every checkpoint_interval generations. Defaults to no checkpoints.
+    checkpoint_interval -- The number of generations between checkpoints. Defaults to 10.
+    resume -- A boolean, if true and checkpoint_path exists continue from the population saved there instead, counting the generations it had already evolved towards n_generations. Defaults to false.
     """
-    for i in range(0, n_generations):
-        population = population.new_population(preserve_percent, non_optimal, mutation_percent)
+    start = 0
+    if resume and checkpoint_path is not None and os.path.exists(checkpoint_path):
+        population, start, state = load_population(checkpoint_path, _fitness_func(population), population.evaluator,
+                                                   population.cache)
+    for i in range(start, n_generations):
+        population = population.new_population(preserve_percent, non_optimal, mutation_percent, strategy)
+        if checkpoint_path is not None and (i + 1) % checkpoint_interval == 0:
+            save_population(checkpoint_path, population, i + 1)
     return population
+
+### Async Functions ###
+async def evolve_async(n_individuals, individual_length, fitness_func, preserve_percent,
+                       non_optimal = 0, mutation_percent = 0.05, gene_max = 100, maximize = False,
+                       population_class = Population, batch_fitness = False, cache = None, strategy = None,
+                       checkpoint_path = None, checkpoint_interval = 10, resume = False, criteria = None, rng = None,
+                       concurrency = 10, timeout = None, penalty = None):
+    """Evolve a solution to a coroutine fitness function, evaluating each generation concurrently.
+
+    Runs evolve with an evaluation.AsyncEvaluator in a worker thread, so the
+    fitness function's calls run on the running event loop, up to concurrency
+    at a time, and the loop stays free while a generation is bred.
+
+    Usage:
+    await evolve_async(n_individuals, individual_length, fitness_func, preserve_percent[, non_optimal, mutation_percent, gene_max, maximize, population_class, batch_fitness, cache, strategy, checkpoint_path, checkpoint_interval, resume, criteria, rng, concurrency, timeout, penalty])
+
+    Parameters:
+    fitness_func -- A coroutine function that takes a chromosome and returns its fitness.
+    concurrency -- The maximum number of fitness function calls in flight. Defaults to 10.
+    timeout -- The seconds a fitness function call may run before it is cancelled. Defaults to no limit.
+    penalty -- The fitness given to an individual whose call timed out. Defaults to the worst possible fitness, math.inf or -math.inf when maximizing; infinite fitnesses are left out of the average fitness the stopping criteria see.
+    The other parameters are those of evolve.
+    """
+    if penalty is None:
+        penalty = -math.inf if maximize else math.inf
+    evaluator = evaluation.AsyncEvaluator(concurrency, timeout, penalty, asyncio.get_running_loop())
+    return await asyncio.to_thread(evolve, n_individuals, individual_length, fitness_func, preserve_percent,
+                                   non_optimal, mutation_percent, gene_max, maximize, population_class,
+                                   batch_fitness, evaluator, cache, strategy, checkpoint_path, checkpoint_interval,
+                                   resume, criteria, rng)
+
+async def generations_async(n_generations, population, preserve_percent, non_optimal = 0, mutation_percent = 0.05,
+                            strategy = None, checkpoint_path = None, checkpoint_interval = 10, resume = False):
+    """Evolve a population for given number of generations without blocking the running event loop.
+
+    Runs generations in a worker thread. A population created with an
+    evaluation.AsyncEvaluator has its evaluator set to run the fitness
+    function's calls on the running event loop.
+
+    Usage:
+    await generations_async(n_generations, population, preserve_percent[, non_optimal, mutation_percent, strategy, checkpoint_path, checkpoint_interval, resume])
+
+    Parameters:
+    The parameters are those of generations.
+    """
+    if isinstance(population.evaluator, evaluation.AsyncEvaluator):
+        population.evaluator.loop = asyncio.get_running_loop()
+    return await asyncio.to_thread(generations, n_generations, population, preserve_percent, non_optimal,
+                                   mutation_percent, strategy, checkpoint_path, checkpoint_interval, resume)
+
+### Checkpoint Functions ###
+def save_population(path, population, generation = 0, state = None):
+    """Save a population, and the state of the random number generators, to a checkpoint file.
+
+    Chromosomes and fitnesses are stored as raw arrays; the fitness function is
+    not saved and must be given again to load_population.
+
+    Usage:
+    save_population(path, population[, generation, state])
+
+    Parameters:
+    path -- The path of the file to write.
+    population -- A Population or ArrayPopulation.
+    generation -- The number of generations evolved so far. Defaults to 0.
+    state -- A dictionary of JSON serializable values to restore along with the population. Defaults to none.
+    """
+    header = {"generation": generation, "state": state or {}, "maximize": population.maximize,
+              "batch_fitness": population.batch_fitness, "sorted": population._sorted,
+              "rng": population.rng.get_state()}
+    if isinstance(population, ArrayPopulation):
+        header.update(kind = "array", gene_max = population.gene_max)
+        arrays = {"chromosomes": population._chromosomes, "fitnesses": population._fitnesses}
+    else:
+        individuals = population._individuals
+        fitnesses = [individual.fitness for individual in individuals]
+        # Integer fitnesses are kept as integers so a resumed run compares them exactly as before.
+        fitness_type = "q" if all(type(fitness) is int for fitness in fitnesses) else "d"
+        header.update(kind = "compact" if isinstance(population, CompactPopulation) else "list",
+                      gene_max = individuals[0].max, length = individuals[0].length,
+                      n_individuals = population.n_individuals)
+        arrays = {"chromosomes": array.array("q", itertools.chain.from_iterable(
+                      individual.chromosome for individual in individuals)),
+                  "fitnesses": array.array(fitness_type, fitnesses)}
+    checkpoint.save(path, header, arrays)
+
+def load_population(path, fitness_func, evaluator = None, cache = None, restore_random = True):
+    """Load a population saved by save_population.
+
+    Returns a tuple of the population, the number of generations it had evolved
+    and the state dictionary saved with it. An ArrayPopulation uses the
+    memory-mapped arrays of the file directly. A population that was drawing
+    from its own RNG gets it back in its saved state.
+
+    Usage:
+    load_population(path, fitness_func[, evaluator, cache, restore_random])
+
+    Parameters:
+    path -- The path of a file written by save_population.
+    fitness_func -- A function that takes a chromosome and returns its fitness.
+    evaluator -- An evaluation.Evaluator used to compute fitnesses. Defaults to serial evaluation.
+    cache -- An evaluation.FitnessCache shared by every generation. Defaults to no cache.
+    restore_random -- A boolean, if true set the random number generators to their saved state. Defaults to true.
+    """
+    saved = checkpoint.load(path)
+    header = saved.header
+    rng = randomness.from_state(header.get("rng"))
+    if header["kind"] == "array":
+        population = New_ArrayPopulation(saved.array("chromosomes"), saved.array("fitnesses"), header["gene_max"],
+                                         fitness_func, header["maximize"], header["batch_fitness"], evaluator,
+                                         cache, rng)
+        population._sorted = header["sorted"]
+    elif header["kind"] == "compact":
+        genes = saved.values("chromosomes")
+        length = header["length"]
+        config = Config(header["gene_max"], length, fitness_func)
+        individuals = [CompactIndividual(genes[start:start + length], config, fitness)
+                       for start, fitness in zip(range(0, len(genes), length), saved.values("fitnesses"))]
+        population = New_CompactPopulation(header["n_individuals"], individuals, config, header["maximize"],
+                                           header["batch_fitness"], evaluator, cache, rng = rng)
+        population._sorted = header["sorted"]
+    else:
+        genes = saved.values("chromosomes")
+        length = header["length"]
+        individuals = [NewIndividual(genes[start:start + length], header["gene_max"], fitness_func, fitness)
+                       for start, fitness in zip(range(0, len(genes), length), saved.values("fitnesses"))]
+        population = New_Population(header["n_individuals"], individuals, header["maximize"],
+                                    header["batch_fitness"], evaluator, cache, rng)
+        population._sorted = header["sorted"]
+    if restore_random:
+        saved.restore_random_state()
+    return population, saved.generation, saved.state
+
+def _fitness_func(population):
+    if isinstance(population, ArrayPopulation):
+        return population.fitness_func
+    return population._individuals[0].fitness_func
+
+### Delta Fitness Functions ###
+# A child that differs from its parent in more than this proportion of its
+# genes is evaluated in full, since a delta touching most genes saves nothing.
+DELTA_LIMIT = 0.25
+
+def _delta_fitness(individual):
+    # The fitness of an individual from its parent's with the fitness function's
+    # delta method, or None if it has no parent recorded or differs from it in
+    # too many genes. The record is cleared either way.
+    parent, changed = individual._parent, individual._changed
+    individual._parent = individual._changed = None
+    if changed is None:
+        return None
+    positions = sorted(set(changed))
+    if len(positions) > DELTA_LIMIT * len(individual.chromosome):
+        return None
+    return individual.fitness_func.delta(individual.chromosome, parent[0], parent[1], positions)
+
+### Deduplication Functions ###
+# The number of times a clone is mutated again before it is kept anyway, which
+# happens when there are fewer possible chromosomes than individuals.
+_DEDUPE_ATTEMPTS = 3
+
+def _changed_positions(parent_chromosome, chromosome, taken):
+    # The positions, among those crossover took from the other parent, where the child's gene differs.
+    return [index for index in taken if chromosome[index] != parent_chromosome[index]]
+
+def _make_unique(child, seen, mutation_percent, rng):
+    # Mutate a child again while it repeats a chromosome in seen, then add it to
+    # seen. Returns 1 if the child was bred as a clone.
+    key = tuple(child.chromosome)
+    if key not in seen:
+        seen.add(key)
+        return 0
+    probability = max(mutation_percent, 1 / len(key)) if key else 0
+    for attempt in range(0, _DEDUPE_ATTEMPTS):
+        child.mutate(probability, rng)
+        key = tuple(child.chromosome)
+        if key not in seen:
+            break
+    seen.add(key)
+    return 1
+
+def _duplicate_rows(parent_chromosomes, children):
+    # The indexes of the rows of children equal to a parent row or an earlier child row.
+    rows = numpy.concatenate((parent_chromosomes, children))
+    if not len(rows):
+        return numpy.empty(0, dtype = numpy.intp)
+    first = numpy.zeros(len(rows), dtype = bool)
+    first[numpy.unique(rows, axis = 0, return_index = True)[1]] = True
+    return numpy.flatnonzero(~first[len(parent_chromosomes):])
+
+### Array Helper Functions ###
+def _gene_dtype(gene_max):
+    if gene_max < 2 ** 31:
+        return numpy.int32
+    return numpy.int64
+
+def _bernoulli_positions(n_positions, probability, rng):
+    # Draw the gaps between successes instead of one uniform per position, so the
+    # work done is proportional to the number of mutations rather than the array size.
+    if probability <= 0 or n_positions == 0:
+        return numpy.empty(0, dtype = numpy.intp)
+    if probability >= 1:
+        return numpy.arange(n_positions)
+    expected = math.ceil(n_positions * probability * 1.1) + 16
+    positions = numpy.cumsum(rng.geometric(probability, expected)) - 1
+    while positions[-1] < n_positions:
+        extra = numpy.cumsum(rng.geometric(probability, expected)) + positions[-1]
+        positions = numpy.concatenate((positions, extra))
+    return positions[positions < n_positions]
@@ -1,103 +1,343 @@
-import random
+import os
+import time
+import asyncio
 import copy
 import math
+import operator
+import array
+import weakref
+import itertools
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import evaluation
+import selection
+import checkpoint
+import monitoring
+import randomness
 
 FUNCS = ["+", "-", "*", "/"]
 TERMS = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
+PENALTY = 1000000
+# Hard limits on the trees crossover and insert may produce. A child over
+# either limit is replaced by its parent; None disables a limit.
+DEPTH_LIMIT = 17
+SIZE_LIMIT = 1000
+
+# Instruction kinds of a compiled Program. String terminals are variables.
+_CONSTANT, _VARIABLE, _FUNCTION = 0, 1, 2
+
+# Every live BinaryTree, keyed on (node, left, right).
+_NODES = weakref.WeakValueDictionary()
+# What BinaryTree._simplified holds until simplify has seen the node.
+_UNSIMPLIFIED = object()
+# Tokens telling apart the datasets whose subtree values share a SubtreeCache.
+_DATASETS = itertools.count()
 
 class BinaryTree(object):
-    def __init__(self, node, left, right):
-        self.node = node
-        self.left = left
-        self.right = right
+    # Nodes are hash-consed: building a node equal to a live one returns that
+    # node, so equal subtrees anywhere in a population are a single object and
+    # identity is structural equality. The structural hash is computed once,
+    # from the children's, when a node is first built. Nodes are never changed
+    # in place, which the sharing depends on. Each node also caches the size
+    # and depth of its subtree, so treesize and treedepth take constant time,
+    # and remembers its simplified form once simplify has computed it.
+    __slots__ = ("node", "left", "right", "size", "depth", "_hash", "_simplified", "__weakref__")
+
+    def __new__(cls, node, left, right):
+        key = (node, left, right)
+        tree = _NODES.get(key)
+        if tree is None:
+            tree = object.__new__(cls)
+            tree.node = node
+            tree.left = left
+            tree.right = right
+            tree.size = 1 + treesize(left) + treesize(right)
+            tree.depth = 1 + max(treedepth(left), treedepth(right))
+            tree._hash = hash(key)
+            tree._simplified = _UNSIMPLIFIED
+            _NODES[key] = tree
+        return tree
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (BinaryTree, (self.node, self.left, self.right))
 
     def __str__(self):
-        return "(" + str(self.node) + " " + str(self.left) + " " + str(self.right) + ")"
+        # (node left right), built without recursion like the FlatTree text.
+        return _prefix_string(_prefix_symbols(self))
+
+class FlatTree(object):
+    # A tree stored in prefix order in two flat arrays. codes[i] is the node at
+    # position i, -1 - FUNCS.index(func) for a function and TERMS.index(term) for
+    # a terminal. sizes[i] is the number of nodes in the subtree rooted at i, so
+    # that subtree is the slice [i, i + sizes[i]) and the genetic operators are
+    # slice splices. heights[i] is the depth of that subtree, kept up to date by
+    # the operators so the depth limit is a lookup rather than a walk of the
+    # codes. Nothing here recurses, so depth is only limited by memory.
+    def __init__(self, codes, sizes = None, heights = None):
+        self.codes = array.array("l", codes)
+        if sizes is None or heights is None:
+            sizes, heights = subtree_shape(self.codes)
+        self.sizes = array.array("l", sizes)
+        self.heights = array.array("l", heights)
+
+    @classmethod
+    def from_tree(cls, tree):
+        func_codes = {func: -1 - index for index, func in enumerate(FUNCS)}
+        codes = []
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, BinaryTree):
+                codes.append(func_codes[node.node])
+                stack.append(node.right)
+                stack.append(node.left)
+            else:
+                codes.append(TERMS.index(node))
+        return cls(codes)
+
+    def to_tree(self):
+        stack = []
+        for code in reversed(self.codes):
+            if code < 0:
+                left = stack.pop()
+                right = stack.pop()
+                stack.append(BinaryTree(FUNCS[-1 - code], left, right))
+            else:
+                stack.append(TERMS[code])
+        return stack[0]
+
+    def symbols(self):
+        return [FUNCS[-1 - code] if code < 0 else TERMS[code] for code in self.codes]
+
+    def depth(self):
+        return self.heights[0]
+
+    def copy(self):
+        return FlatTree(self.codes, self.sizes, self.heights)
+
+    def subtree(self, index):
+        end = index + self.sizes[index]
+        return FlatTree(self.codes[index:end], self.sizes[index:end], self.heights[index:end])
+
+    def replace(self, index, subtree):
+        end = index + self.sizes[index]
+        growth = len(subtree) - self.sizes[index]
+        ancestors = self.ancestors(index)
+        sizes = self.sizes[:index]
+        for ancestor in ancestors:
+            sizes[ancestor] += growth
+        tree = FlatTree(self.codes[:index] + subtree.codes + self.codes[end:],
+                        sizes + subtree.sizes + self.sizes[end:],
+                        self.heights[:index] + subtree.heights + self.heights[end:])
+        # Only the ancestors' heights can change, each from its children's, so fix them bottom up.
+        heights, sizes = tree.heights, tree.sizes
+        for ancestor in reversed(ancestors):
+            left = ancestor + 1
+            heights[ancestor] = 1 + max(heights[left], heights[left + sizes[left]])
+        return tree
+
+    def ancestors(self, index):
+        # Walk down from the root, each step skipping a whole sibling subtree.
+        path = []
+        position = 0
+        while position != index:
+            path.append(position)
+            child = position + 1
+            if index >= child + self.sizes[child]:
+                child += self.sizes[child]
+            position = child
+        return path
+
+    # The mutations draw one uniform per code in bulk, then one symbol per mutated code.
+    def mutate_terms(self, probability, rng = None):
+        rng = randomness.resolve(rng)
+        for index in rng.positions(len(self.codes), probability):
+            if self.codes[index] >= 0 and index > 0:
+                self.codes[index] = rng.randrange(len(TERMS))
+
+    def mutate_funcs(self, probability, rng = None):
+        rng = randomness.resolve(rng)
+        for index in rng.positions(len(self.codes), probability):
+            if self.codes[index] < 0:
+                self.codes[index] = -1 - rng.randrange(len(FUNCS))
+
+    def prune(self, probability, rng = None):
+        rng = randomness.resolve(rng)
+        self._replace_children(probability, lambda: [rng.randrange(len(TERMS))], rng)
+
+    def insert(self, probability, depth, rng = None):
+        rng = randomness.resolve(rng)
+        self._replace_children(probability, lambda: ([-1 - rng.randrange(len(FUNCS))]
+                                                     + buildflat(depth, rng) + buildflat(depth, rng)), rng)
+
+    def crossover(self, other, rng = None):
+        # As for a BinaryTree, the root is never swapped, so both children keep a function at the root.
+        rng = randomness.resolve(rng)
+        index1 = rng.randrange(1, len(self))
+        index2 = rng.randrange(1, len(other))
+        return [self.replace(index1, other.subtree(index2)), other.replace(index2, self.subtree(index1))]
+
+    def _child(self, index, right):
+        child = index + 1
+        if right:
+            child += self.sizes[child]
+        return child
+
+    def _replace_children(self, probability, new_subtree, rng):
+        # One pass in prefix order. A child chosen for replacement is skipped, just
+        # as the recursive BinaryTree operators never descend into what they replaced.
+        replacements = {}
+        index = 0
+        while index < len(self.codes):
+            if index in replacements:
+                index += self.sizes[index]
+                continue
+            if self.codes[index] < 0 and rng.random() < probability:
+                replacements[self._child(index, rng.random() < 0.5)] = new_subtree()
+            index += 1
+        if replacements:
+            self._splice(replacements)
+
+    def _splice(self, replacements):
+        codes = array.array("l")
+        index = 0
+        while index < len(self.codes):
+            if index in replacements:
+                codes.extend(replacements[index])
+                index += self.sizes[index]
+            else:
+                codes.append(self.codes[index])
+                index += 1
+        self.codes = codes
+        self.sizes, self.heights = subtree_shape(codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __str__(self):
+        return _prefix_string((code < 0, FUNCS[-1 - code] if code < 0 else TERMS[code]) for code in self.codes)
+
+class Program(object):
+    # A tree flattened to postfix order once, so evaluating it is a single loop
+    # over a list instead of building source text and running eval() on it.
+    # With ARRAY_OPERATORS the variables may be numpy arrays and the whole
+    # dataset is evaluated by one pass over the program.
+    def __init__(self, tree, operators = None):
+        if operators is None:
+            operators = OPERATORS
+        self.code = [(kind, operators[value]) if kind == _FUNCTION else (kind, value)
+                     for kind, value in postfix(tree)]
+
+    def __call__(self, variables = None):
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        for kind, value in self.code:
+            if kind == _CONSTANT:
+                push(value)
+            elif kind == _VARIABLE:
+                push(variables[value])
+            else:
+                right = pop()
+                stack[-1] = value(stack[-1], right)
+        return stack[0]
 
 class Individual(object):
-    def __init__(self, maxdepth):
-        self.tree = BinaryTree(random.choice(FUNCS),
-                               buildtree(maxdepth), buildtree(maxdepth))
+    # Every random operator takes an optional randomness.RNG to draw from,
+    # defaulting to the global random module.
+    def __init__(self, maxdepth, rng = None):
+        rng = randomness.resolve(rng)
+        self.tree = BinaryTree(rng.choice(FUNCS),
+                               buildtree(maxdepth, rng = rng), buildtree(maxdepth, rng = rng))
 
-    def mutate(self, probability):
-        self.mutate_terms(probability)
-        self.mutate_funcs(probability)
+    def mutate(self, probability, rng = None):
+        self.mutate_terms(probability, rng)
+        self.mutate_funcs(probability, rng)
 
     def eval(self, fitness_func):
         self.fitness = fitness_func(self.tree)
         
-    def insert(self, probability, depth, tree = "start"):
-        if tree == "start":
-            tree = self.tree
-        if tree:
-            if isinstance(tree, BinaryTree):
-                if random.random() < probability:
-                    if random.random() < 0.5:
-                        tree.right = BinaryTree(random.choice(FUNCS),
-                                                buildtree(depth),
-                                                buildtree(depth))
-                        self.insert(probability, depth, tree.left)
-                    else:
-                        tree.left = BinaryTree(random.choice(FUNCS),
-                                               buildtree(depth),
-                                               buildtree(depth))
-                        self.insert(probability, depth, tree.right)
-                else:
-                    self.insert(probability, depth, tree.left)
-                    self.insert(probability, depth, tree.right)
-                             
-    def prune(self, probability, tree = "start"):
-        if tree == "start":
-            tree = self.tree
-        if tree:
-            if isinstance(tree, BinaryTree):
-                if random.random() < probability:
-                    if random.random() < 0.5:
-                        tree.right = random.choice(TERMS)
-                    else:
-                        tree.left = random.choice(TERMS)
-                self.prune(probability, tree.left)
-                self.prune(probability, tree.right)
-                
-    def mutate_terms(self, probability, tree = "start"):
-        if tree == "start":
-            tree = self.tree
-        if tree:
-            if isinstance(tree, BinaryTree):
-                if not isinstance(tree.left, BinaryTree):
-                    if random.random() < probability:
-                        tree.left = random.choice(TERMS)
-                if not isinstance(tree.right, BinaryTree):
-                    if random.random() < probability:
-                       tree.right = random.choice(TERMS)
-                self.mutate_terms(probability, tree.left)
-                self.mutate_terms(probability, tree.right)
-                
-    def mutate_funcs(self, probability, tree = "start"):
-        if tree == "start":
-            tree = self.tree
-        if tree:
-            if isinstance(tree, BinaryTree):
-                if random.random() < probability:
-                    tree.node = random.choice(FUNCS)
-                self.mutate_funcs(probability, tree.left)
-                self.mutate_funcs(probability, tree.right)
-
-    def crossover(self, other):
-        tree1 = copy.copy(self.tree)
-        tree2 = copy.copy(other.tree)
-        crossover_side = random.choice(["l", "r"])
-        if crossover_side == "l":
-            subtree1 = self.tree.left
-            subtree2 = other.tree.left
-            tree1.left = subtree2
-            tree2.left = subtree1
-        elif crossover_side == "r":
-            subtree1 = self.tree.right
-            subtree2 = other.tree.right
-            tree1.right = subtree2
-            tree2.right = subtree1
-        return [NewIndividual(tree1), NewIndividual(tree2)]
+    # The operators never modify a BinaryTree in place. Each rebuilds only the
+    # path from the root to the nodes it changes and shares every untouched
+    # subtree, so children can share structure with their parents without a
+    # deepcopy and without ever altering them.
+    def insert(self, probability, depth, rng = None):
+        tree = self._insert(self.tree, probability, depth, randomness.resolve(rng))
+        if within_limits(tree):
+            self.tree = tree
+
+    def _insert(self, tree, probability, depth, rng):
+        if not isinstance(tree, BinaryTree):
+            return tree
+        if rng.random() < probability:
+            new_subtree = BinaryTree(rng.choice(FUNCS), buildtree(depth, rng = rng), buildtree(depth, rng = rng))
+            if rng.random() < 0.5:
+                return BinaryTree(tree.node, self._insert(tree.left, probability, depth, rng), new_subtree)
+            return BinaryTree(tree.node, new_subtree, self._insert(tree.right, probability, depth, rng))
+        return rebuild(tree, tree.node, self._insert(tree.left, probability, depth, rng),
+                       self._insert(tree.right, probability, depth, rng))
+
+    def prune(self, probability, rng = None):
+        self.tree = self._prune(self.tree, probability, randomness.resolve(rng))
+
+    def _prune(self, tree, probability, rng):
+        if not isinstance(tree, BinaryTree):
+            return tree
+        left, right = tree.left, tree.right
+        if rng.random() < probability:
+            if rng.random() < 0.5:
+                right = rng.choice(TERMS)
+            else:
+                left = rng.choice(TERMS)
+        return rebuild(tree, tree.node, self._prune(left, probability, rng), self._prune(right, probability, rng))
+
+    def mutate_terms(self, probability, rng = None):
+        self.tree = self._mutate_terms(self.tree, probability, randomness.resolve(rng))
+
+    def _mutate_terms(self, tree, probability, rng):
+        if not isinstance(tree, BinaryTree):
+            return tree
+        left, right = tree.left, tree.right
+        if not isinstance(left, BinaryTree):
+            if rng.random() < probability:
+                left = rng.choice(TERMS)
+        if not isinstance(right, BinaryTree):
+            if rng.random() < probability:
+                right = rng.choice(TERMS)
+        return rebuild(tree, tree.node, self._mutate_terms(left, probability, rng),
+                       self._mutate_terms(right, probability, rng))
+
+    def mutate_funcs(self, probability, rng = None):
+        self.tree = self._mutate_funcs(self.tree, probability, randomness.resolve(rng))
+
+    def _mutate_funcs(self, tree, probability, rng):
+        if not isinstance(tree, BinaryTree):
+            return tree
+        node = tree.node
+        if rng.random() < probability:
+            node = rng.choice(FUNCS)
+        return rebuild(tree, node, self._mutate_funcs(tree.left, probability, rng),
+                       self._mutate_funcs(tree.right, probability, rng))
+
+    def crossover(self, other, rng = None):
+        # Swap a random subtree of each parent, chosen uniformly by node index.
+        # The root is never chosen, so both children keep a function at the root.
+        rng = randomness.resolve(rng)
+        index1 = rng.randrange(1, treesize(self.tree))
+        index2 = rng.randrange(1, treesize(other.tree))
+        subtree1 = getsubtree(self.tree, index1)
+        subtree2 = getsubtree(other.tree, index2)
+        child1 = replace_subtree(self.tree, index1, subtree2)
+        child2 = replace_subtree(other.tree, index2, subtree1)
+        return [NewIndividual(child1 if within_limits(child1) else self.tree),
+                NewIndividual(child2 if within_limits(child2) else other.tree)]
 
     def __str__(self):
         return str(self.tree)
@@ -118,113 +358,601 @@ class NewIndividual(Individual):
     def __init__(self, tree):
         self.tree = tree
 
+class FlatIndividual(Individual):
+    # An individual whose tree is a FlatTree; the operators are slice splices.
+    def __init__(self, maxdepth, rng = None):
+        rng = randomness.resolve(rng)
+        self.tree = FlatTree([-1 - rng.randrange(len(FUNCS))]
+                             + buildflat(maxdepth, rng) + buildflat(maxdepth, rng))
+
+    def insert(self, probability, depth, rng = None):
+        # insert replaces the arrays rather than changing them, so the old ones are a cheap undo.
+        codes, sizes, heights = self.tree.codes, self.tree.sizes, self.tree.heights
+        self.tree.insert(probability, depth, rng)
+        if not within_limits(self.tree):
+            self.tree.codes, self.tree.sizes, self.tree.heights = codes, sizes, heights
+
+    def prune(self, probability, rng = None):
+        self.tree.prune(probability, rng)
+
+    def mutate_terms(self, probability, rng = None):
+        self.tree.mutate_terms(probability, rng)
+
+    def mutate_funcs(self, probability, rng = None):
+        self.tree.mutate_funcs(probability, rng)
+
+    def crossover(self, other, rng = None):
+        return [NewFlatIndividual(tree if within_limits(tree) else parent.tree.copy())
+                for tree, parent in zip(self.tree.crossover(other.tree, rng), (self, other))]
+
+class NewFlatIndividual(FlatIndividual):
+    def __init__(self, tree):
+        self.tree = tree
+
 class Population(object):
-    def __init__(self, n_individuals, max_depth):
-        self.individuals = []
+    # Individuals are ranked, for sorting and for choosing parents, by their
+    # fitness plus parsimony times their size. With lexicographic, ties are
+    # then broken in favour of the smaller tree; the ranks are then tuples,
+    # which the ranking strategies accept but StochasticUniversal does not.
+    # Every random number is drawn from rng, a randomness.RNG, or from the
+    # global random module if it is None.
+    def __init__(self, n_individuals, max_depth, evaluator = None, flat = False, parsimony = 0,
+                 lexicographic = False, rng = None):
+        self.rng = randomness.resolve(rng)
         self.n_individuals = n_individuals
-        for i in range(0, n_individuals):
-            self.individuals.append(Individual(max_depth))
+        self.evaluator = evaluator
+        self.parsimony = parsimony
+        self.lexicographic = lexicographic
+        self.timings = {"breed": 0.0, "evaluate": 0.0}
+        self.evaluations = 0
+        self.cache_hits = self.cache_misses = 0
+        individual_class = FlatIndividual if flat else Individual
+        self.individuals = [individual_class(max_depth, self.rng) for i in range(0, n_individuals)]
+
+    # Sorted only when first read in order; new_population needs just the best few.
+    # Until every individual has been evaluated the list is returned as it is.
+    @property
+    def individuals(self):
+        if not self._sorted and all(hasattr(individual, "fitness") for individual in self._individuals):
+            self._individuals.sort(key = self._rank_key())
+            self._sorted = True
+        return self._individuals
+
+    @individuals.setter
+    def individuals(self, individuals):
+        self._individuals = individuals
+        self._sorted = False
 
     def eval(self, fitness_func):
-        for individual in self.individuals:
-            individual.eval(fitness_func)
-        self.individuals.sort()
+        # cache_hits and cache_misses count the lookups of the fitness function's
+        # SubtreeCache, if it has one, made in this process during this call.
+        start = time.perf_counter()
+        cache = getattr(fitness_func, "cache", None)
+        if cache is not None:
+            hits, misses = cache.hits, cache.misses
+        fitnesses = evaluation.evaluate(fitness_func, [individual.tree for individual in self._individuals],
+                                        evaluator = self.evaluator)
+        for individual, fitness in zip(self._individuals, fitnesses):
+            individual.fitness = fitness
+        self._sorted = False
+        self.timings["evaluate"] = time.perf_counter() - start
+        self.evaluations = len(fitnesses)
+        if cache is not None:
+            self.cache_hits = cache.hits - hits
+            self.cache_misses = cache.misses - misses
         sum = 0
-        for individual in self.individuals:
+        for individual in self._individuals:
             sum += individual.fitness
         return sum / self.n_individuals
+
+    def _rank_key(self):
+        # None when individuals are ranked by fitness alone.
+        parsimony = self.parsimony
+        if self.lexicographic:
+            return lambda individual: (individual.fitness + parsimony * treesize(individual.tree),
+                                       treesize(individual.tree))
+        if parsimony:
+            return lambda individual: individual.fitness + parsimony * treesize(individual.tree)
+        return None
+
+    def diversity(self):
+        # The proportion of distinct trees in the population.
+        distinct = set(_tree_key(individual.tree) for individual in self._individuals)
+        return len(distinct) / self.n_individuals
         
-    def new_population(self, preserve_percent, non_optimal = 0, mutation_percent = .05):
+    def new_population(self, preserve_percent, non_optimal = 0, mutation_percent = .05, strategy = None):
+        start = time.perf_counter()
+        rng = self.rng
         n_parents = math.floor(self.n_individuals * preserve_percent)
         n_non_optimal = math.floor(self.n_individuals * non_optimal)
-        parents = self.individuals[:n_parents]
+        rank_key = self._rank_key()
+        if self._sorted:
+            parents = self._individuals[:n_parents]
+        else:
+            parents = selection.best(self._individuals, n_parents, key = rank_key)
         for i in range(0, n_non_optimal):
-            parents.append(random.choice(self.individuals))
+            parents.append(rng.choice(self._individuals))
         next_gen_individuals = copy.copy(parents)
-        while len(next_gen_individuals) < self.n_individuals:
-            parent1 = random.choice(parents)
-            parent2 = random.choice(parents)
-            child = random.choice(parent1.crossover(parent2))
-            child.mutate_funcs(mutation_percent)
-            child.mutate_terms(mutation_percent)
-            child.prune(mutation_percent)
-            child.insert(mutation_percent, 3)
+        n_children = max(self.n_individuals - len(next_gen_individuals), 0)
+        if strategy is None:
+            mothers = [rng.choice(parents) for i in range(0, n_children)]
+            fathers = [rng.choice(parents) for i in range(0, n_children)]
+        else:
+            if rank_key is None:
+                fitnesses = [individual.fitness for individual in self._individuals]
+            else:
+                fitnesses = [rank_key(individual) for individual in self._individuals]
+            chosen = [self._individuals[index]
+                      for index in strategy.select(fitnesses, False, 2 * n_children, rng = rng)]
+            mothers, fathers = chosen[:n_children], chosen[n_children:]
+        for parent1, parent2 in zip(mothers, fathers):
+            child = rng.choice(parent1.crossover(parent2, rng))
+            child.mutate_funcs(mutation_percent, rng)
+            child.mutate_terms(mutation_percent, rng)
+            child.prune(mutation_percent, rng)
+            child.insert(mutation_percent, 3, rng)
             next_gen_individuals.append(child)
-        return NewPopulation(self.n_individuals, next_gen_individuals)
+        next_generation = NewPopulation(self.n_individuals, next_gen_individuals, self.evaluator, self.parsimony,
+                                        self.lexicographic, rng)
+        next_generation.timings["breed"] = time.perf_counter() - start
+        return next_generation
 
 class NewPopulation(Population):
-    def __init__(self, n_individuals, individuals):
+    def __init__(self, n_individuals, individuals, evaluator = None, parsimony = 0, lexicographic = False,
+                 rng = None):
+        self.rng = randomness.resolve(rng)
         self.individuals = individuals
         self.n_individuals = n_individuals
+        self.evaluator = evaluator
+        self.parsimony = parsimony
+        self.lexicographic = lexicographic
+        self.timings = {"breed": 0.0, "evaluate": 0.0}
+        self.evaluations = 0
+        self.cache_hits = self.cache_misses = 0
 
-class Queue(object):
-    def __init__(self, length):
-        self.queue = [0 for i in range(0, length)]
-        self.length = length
-        
-    def append(self, item):
-        self.queue.append(item)
-        self.queue = self.queue[1:]
+# The five-generation fitness window of evolve; kept here for existing callers.
+Queue = monitoring.Queue
 
-    def __iter__(self):
-        for item in self.queue:
-            yield item
+def buildtree(maxdepth, curdepth = 0, rng = None):
+    rng = randomness.resolve(rng)
+    if curdepth >= maxdepth:
+        return rng.choice(TERMS)
+    else:
+        if rng.random() > 0.5:
+            return rng.choice(TERMS)
+        else:
+            return BinaryTree(rng.choice(FUNCS),
+                              buildtree(maxdepth, curdepth + 1, rng),
+                              buildtree(maxdepth, curdepth + 1, rng))
 
-    def __str__(self):
-        return str(self.queue)
+def rebuild(tree, node, left, right):
+    if node is tree.node and left is tree.left and right is tree.right:
+        return tree
+    return BinaryTree(node, left, right)
 
-    def __getitem__(self, index):
-        return self.queue[index]
+def treesize(tree):
+    if isinstance(tree, BinaryTree):
+        return tree.size
+    if isinstance(tree, FlatTree):
+        return len(tree)
+    return 1
 
-    def __len__(self):
-        return self.length
+def treedepth(tree):
+    if isinstance(tree, BinaryTree):
+        return tree.depth
+    if isinstance(tree, FlatTree):
+        return tree.depth()
+    return 0
 
-    def __contains__(self, item):
-        return item in self.queue
-    
-def buildtree(maxdepth, curdepth = 0):
-    if curdepth >= maxdepth:
-        return random.choice(TERMS)
-    else:
-        if random.random() > 0.5:
-            return random.choice(TERMS)
+def within_limits(tree):
+    return ((SIZE_LIMIT is None or treesize(tree) <= SIZE_LIMIT)
+            and (DEPTH_LIMIT is None or treedepth(tree) <= DEPTH_LIMIT))
+
+def getsubtree(tree, index):
+    # index counts nodes in prefix order, the root being 0.
+    while index:
+        left_size = treesize(tree.left)
+        if index <= left_size:
+            tree, index = tree.left, index - 1
         else:
-            return BinaryTree(random.choice(FUNCS),
-                              buildtree(maxdepth, curdepth + 1),
-                              buildtree(maxdepth, curdepth + 1))
-
-def evolve(n_individuals, max_depth, fitness_func, preserve_percent, non_optimal = 0, mutation_percent = 0.05):
-    generation = Population(n_individuals, max_depth)
-    fitnesses = Queue(5)
-    for i in range(0, 5):
-        fitnesses.append(generation.eval(fitness_func))
-        generation = generation.new_population(preserve_percent, non_optimal, mutation_percent)
-    sum = 0
-    for item in fitnesses:
-        sum += item
-    avg = sum / 5
-    next_fitness = generation.eval(fitness_func)
-    while next_fitness < avg:
-        generation = generation.new_population(preserve_percent, non_optimal, mutation_percent)
-        fitnesses.append(generation.eval(fitness_func))
-        sum = 0
-        for item in fitnesses:
-            sum += item
-        avg = sum / 5
-    print("Fittest individual has a fitness of " + str(generation.individuals[0].fitness))
-    print("Population has an average fitness of " + str(fitnesses[-1]))
+            tree, index = tree.right, index - 1 - left_size
+    return tree
+
+def replace_subtree(tree, index, subtree):
+    # A copy of tree with the node at index replaced; only the path to it is copied.
+    if index == 0:
+        return subtree
+    left_size = treesize(tree.left)
+    if index <= left_size:
+        return BinaryTree(tree.node, replace_subtree(tree.left, index - 1, subtree), tree.right)
+    return BinaryTree(tree.node, tree.left, replace_subtree(tree.right, index - 1 - left_size, subtree))
+
+def buildflat(maxdepth, rng = None):
+    # The prefix codes of a tree grown like buildtree, without recursion.
+    rng = randomness.resolve(rng)
+    codes = []
+    depths = [0]
+    while depths:
+        depth = depths.pop()
+        if depth >= maxdepth or rng.random() > 0.5:
+            codes.append(rng.randrange(len(TERMS)))
+        else:
+            codes.append(-1 - rng.randrange(len(FUNCS)))
+            depths.append(depth + 1)
+            depths.append(depth + 1)
+    return codes
+
+def subtree_shape(codes):
+    # The size and the depth of the subtree rooted at each code, in one pass from the right.
+    sizes = array.array("l", bytes(len(codes) * array.array("l").itemsize))
+    heights = array.array("l", sizes)
+    stack = []
+    for index in range(len(codes) - 1, -1, -1):
+        if codes[index] < 0:
+            left_size, left_height = stack.pop()
+            right_size, right_height = stack.pop()
+            size, height = 1 + left_size + right_size, 1 + max(left_height, right_height)
+        else:
+            size, height = 1, 0
+        sizes[index] = size
+        heights[index] = height
+        stack.append((size, height))
+    return sizes, heights
+
+def evolve(n_individuals, max_depth, fitness_func, preserve_percent, non_optimal = 0, mutation_percent = 0.05,
+           evaluator = None, flat = False, strategy = None, checkpoint_path = None, checkpoint_interval = 10,
+           resume = False, criteria = None, parsimony = 0, lexicographic = False, rng = None):
+    # Runs until one of the criteria (see the monitoring module) is met, by
+    # default once the average fitness is no lower than its mean over the five
+    # generations before. With a checkpoint_path the population is saved every
+    # checkpoint_interval generations, and with resume a saved run is continued
+    # where it stopped. parsimony and lexicographic set how the population
+    # ranks individuals (see Population), and rng, a randomness.RNG, is what
+    # it draws from.
+    if criteria is None:
+        criteria = [monitoring.MovingAverage(5)]
+    n_generations = 0
+    if resume and checkpoint_path is not None and os.path.exists(checkpoint_path):
+        generation, n_generations, state = load_population(checkpoint_path, evaluator)
+        if state.get("criteria") is not None:
+            monitoring.set_states(criteria, state["criteria"])
+    else:
+        generation = Population(n_individuals, max_depth, evaluator, flat, parsimony, lexicographic, rng)
+    snapshots = stream(generation, fitness_func, preserve_percent, non_optimal, mutation_percent, strategy,
+                       n_generations)
+    for snapshot in snapshots:
+        # Saved before the criteria see the snapshot, so a resumed run feeds them the same one again.
+        if checkpoint_path is not None and snapshot.generation > n_generations \
+           and snapshot.generation % checkpoint_interval == 0:
+            save_population(checkpoint_path, snapshot.population, snapshot.generation,
+                            {"criteria": monitoring.get_states(criteria)})
+        if any([criterion(snapshot) for criterion in criteria]):
+            break
+    generation = snapshot.population
+    print("Fittest individual has a fitness of " + str(snapshot.best_fitness))
+    print("Population has an average fitness of " + str(snapshot.avg_fitness))
     return generation
 
+async def evolve_async(n_individuals, max_depth, fitness_func, preserve_percent, non_optimal = 0,
+                       mutation_percent = 0.05, flat = False, strategy = None, checkpoint_path = None,
+                       checkpoint_interval = 10, resume = False, criteria = None, parsimony = 0, lexicographic = False,
+                       rng = None, concurrency = 10, timeout = None, penalty = PENALTY):
+    # evolve for a coroutine fitness_func. Each generation's calls run on the
+    # running event loop, up to concurrency at a time, while evolve runs in a
+    # worker thread; a call running longer than timeout seconds is cancelled
+    # and its tree gets the penalty fitness (see evaluation.AsyncEvaluator).
+    evaluator = evaluation.AsyncEvaluator(concurrency, timeout, penalty, asyncio.get_running_loop())
+    return await asyncio.to_thread(evolve, n_individuals, max_depth, fitness_func, preserve_percent, non_optimal,
+                                   mutation_percent, evaluator, flat, strategy, checkpoint_path, checkpoint_interval,
+                                   resume, criteria, parsimony, lexicographic, rng)
+
+def stream(population, fitness_func, preserve_percent, non_optimal = 0, mutation_percent = 0.05, strategy = None,
+           generation = 0):
+    # Yields a monitoring.Snapshot of population, evaluated with fitness_func,
+    # and of each generation bred from it, without end.
+    start = time.perf_counter()
+    population.eval(fitness_func)
+    while True:
+        end = time.perf_counter()
+        yield _snapshot(generation, population, end - start)
+        start = time.perf_counter()
+        population = population.new_population(preserve_percent, non_optimal, mutation_percent, strategy)
+        population.eval(fitness_func)
+        generation += 1
+
+def _snapshot(generation, population, elapsed):
+    fitnesses = [individual.fitness for individual in population._individuals]
+    avg_fitness = monitoring.mean(fitnesses)
+    return monitoring.Snapshot(generation, min(fitnesses), avg_fitness, monitoring.std(fitnesses, avg_fitness),
+                               None, population.evaluations, dict(population.timings), elapsed,
+                               population)
+
+def _tree_key(tree):
+    # Hash-consed trees are equal only if they are the same object.
+    if isinstance(tree, FlatTree):
+        return tree.codes.tobytes()
+    return tree
+
+def save_population(path, population, generation = 0, state = None):
+    # Trees are stored in their FlatTree encoding: one array of the codes of
+    # every tree, one of the tree lengths and one of the fitnesses, with nan
+    # standing for an individual that has not been evaluated.
+    individuals = population._individuals
+    lengths = array.array("q")
+    codes = array.array("q")
+    for individual in individuals:
+        tree = individual.tree
+        if not isinstance(tree, FlatTree):
+            tree = FlatTree.from_tree(tree)
+        lengths.append(len(tree.codes))
+        codes.fromlist(tree.codes.tolist())
+    fitnesses = array.array("d", [_saved_fitness(getattr(individual, "fitness", None))
+                                  for individual in individuals])
+    header = {"kind": "program", "generation": generation, "state": state or {},
+              "n_individuals": population.n_individuals, "sorted": population._sorted,
+              "flat": isinstance(individuals[0], FlatIndividual), "parsimony": population.parsimony,
+              "lexicographic": population.lexicographic, "rng": population.rng.get_state()}
+    checkpoint.save(path, header, {"lengths": lengths, "codes": codes, "fitnesses": fitnesses})
+
+def load_population(path, evaluator = None, restore_random = True):
+    # Returns the population, the number of generations it had evolved and the
+    # state dictionary saved with it.
+    saved = checkpoint.load(path)
+    header = saved.header
+    codes = saved.values("codes")
+    individuals = []
+    position = 0
+    for length, fitness in zip(saved.values("lengths"), saved.values("fitnesses")):
+        tree = FlatTree(codes[position:position + length])
+        position += length
+        if header["flat"]:
+            individual = NewFlatIndividual(tree)
+        else:
+            individual = NewIndividual(tree.to_tree())
+        if not math.isnan(fitness):
+            individual.fitness = fitness
+        individuals.append(individual)
+    population = NewPopulation(header["n_individuals"], individuals, evaluator, header.get("parsimony", 0),
+                               header.get("lexicographic", False), randomness.from_state(header.get("rng")))
+    population._sorted = header["sorted"]
+    if restore_random:
+        saved.restore_random_state()
+    return population, saved.generation, saved.state
+
+def _saved_fitness(fitness):
+    if fitness is None:
+        return math.nan
+    return fitness
+
+def divide(left, right):
+    # Protected division: a zero divisor gives nan, which propagates to the result.
+    if right == 0:
+        return math.nan
+    try:
+        return left / right
+    except OverflowError:
+        return math.nan
+
+def array_divide(left, right):
+    left, right = numpy.broadcast_arrays(numpy.asarray(left, dtype = float),
+                                         numpy.asarray(right, dtype = float))
+    result = numpy.full(left.shape, numpy.nan)
+    numpy.divide(left, right, out = result, where = right != 0)
+    return result
+
+OPERATORS = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": divide}
+ARRAY_OPERATORS = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": array_divide}
+
+class MeanSquaredError(object):
+    # Fitness of a tree as the mean squared error of its predictions over a
+    # dataset, e.g. MeanSquaredError({"x": xs}, ys) with "x" in TERMS. With an
+    # evaluation.SubtreeCache the prediction of every subtree is remembered, so
+    # a subtree shared by many trees is evaluated over the dataset once.
+    # With simplified, trees are evaluated in their simplified form.
+    def __init__(self, variables, target, cache = None, simplified = False):
+        self.variables = {name: numpy.asarray(values, dtype = float) for name, values in variables.items()}
+        self.target = numpy.asarray(target, dtype = float)
+        self.cache = cache
+        self.simplified = simplified
+        self.dataset = next(_DATASETS)
+
+    def __call__(self, tree):
+        with numpy.errstate(all = "ignore"):
+            prediction = evaluate_tree(tree, self.variables, ARRAY_OPERATORS, self.cache, self.dataset,
+                                       self.simplified)
+            error = numpy.mean((prediction - self.target) ** 2)
+        if not numpy.isfinite(error):
+            return PENALTY
+        return float(error)
+
+def postfix(tree):
+    if isinstance(tree, FlatTree):
+        return _flat_postfix(tree)
+    code = []
+    stack = [(tree, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not isinstance(node, BinaryTree):
+            if isinstance(node, str):
+                code.append((_VARIABLE, node))
+            else:
+                code.append((_CONSTANT, node))
+        elif expanded:
+            code.append((_FUNCTION, node.node))
+        else:
+            stack.append((node, True))
+            stack.append((node.right, False))
+            stack.append((node.left, False))
+    return code
+
+def _flat_postfix(tree):
+    code = []
+    open_funcs = []
+    for code_value in tree.codes:
+        if code_value < 0:
+            open_funcs.append([FUNCS[-1 - code_value], 2])
+            continue
+        term = TERMS[code_value]
+        code.append((_VARIABLE if isinstance(term, str) else _CONSTANT, term))
+        # Close every function whose last operand this terminal completed.
+        while open_funcs:
+            open_funcs[-1][1] -= 1
+            if open_funcs[-1][1]:
+                break
+            code.append((_FUNCTION, open_funcs.pop()[0]))
+    return code
+
+def evaluate_tree(tree, variables = None, operators = None, cache = None, dataset = None, simplified = False):
+    # The value of tree. With an evaluation.SubtreeCache the value of each
+    # BinaryTree node is looked up under (node, dataset) before it is computed
+    # and stored after, so a cached subtree is never walked. FlatTrees are not
+    # hash-consed and are always run as a Program. With simplified the tree is
+    # evaluated in its simplified form, which costs its simplified size.
+    if simplified:
+        tree = simplify(tree)
+    if cache is None or not isinstance(tree, BinaryTree):
+        return Program(tree, operators)(variables)
+    if operators is None:
+        operators = OPERATORS
+    values = []
+    stack = [(tree, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not isinstance(node, BinaryTree):
+            values.append(variables[node] if isinstance(node, str) else node)
+        elif expanded:
+            right = values.pop()
+            values[-1] = operators[node.node](values[-1], right)
+            cache.put(node, dataset, values[-1])
+        else:
+            value = cache.get(node, dataset)
+            if value is None:
+                stack.append((node, True))
+                stack.append((node.right, False))
+                stack.append((node.left, False))
+            else:
+                values.append(value)
+    return values[0]
+
+def simplify(tree):
+    # An equivalent tree with every constant subtree folded to its value,
+    # x + 0, 0 + x, x - 0, x * 1, 1 * x and x / 1 reduced to x, and a division
+    # by zero folded to nan, as is any operation on nan since nan propagates.
+    # x * 0 is left alone, as x may be nan. Folded constants need not be in
+    # TERMS, so a simplified tree is for evaluating and exporting, not for
+    # breeding or for a FlatTree. Each node remembers its simplified form, so
+    # simplifying a tree that shares subtrees with one already simplified only
+    # visits the new nodes.
+    if isinstance(tree, FlatTree):
+        tree = tree.to_tree()
+    if not isinstance(tree, BinaryTree):
+        return tree
+    # Children are simplified before their parent with an explicit stack, so
+    # trees deeper than the recursion limit simplify too.
+    stack = [tree]
+    while stack:
+        node = stack[-1]
+        pending = [child for child in (node.left, node.right)
+                   if isinstance(child, BinaryTree) and child._simplified is _UNSIMPLIFIED]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        if node._simplified is _UNSIMPLIFIED:
+            simplified = _simplify(node.node, _simplified_form(node.left), _simplified_form(node.right))
+            # None stands for the node itself, which would otherwise be a reference cycle.
+            node._simplified = None if simplified is node else simplified
+    return _simplified_form(tree)
+
+def _simplified_form(tree):
+    if not isinstance(tree, BinaryTree):
+        return tree
+    simplified = tree._simplified
+    return tree if simplified is None else simplified
+
+def _simplify(node, left, right):
+    left_constant = not isinstance(left, (BinaryTree, str))
+    right_constant = not isinstance(right, (BinaryTree, str))
+    if (left_constant and left != left) or (right_constant and right != right):
+        return math.nan
+    if node == "/" and right_constant and right == 0:
+        return math.nan
+    if left_constant and right_constant:
+        return OPERATORS[node](left, right)
+    if node == "+":
+        if left_constant and left == 0:
+            return right
+        if right_constant and right == 0:
+            return left
+    elif node == "-":
+        if right_constant and right == 0:
+            return left
+    elif node == "*":
+        if left_constant and left == 1:
+            return right
+        if right_constant and right == 1:
+            return left
+    elif node == "/":
+        if right_constant and right == 1:
+            return left
+    return BinaryTree(node, left, right)
+
 def tostring(tree):
-    if isinstance(tree, BinaryTree):
-        return tostring(tree.left) + " " + str(tree.node) + " " + tostring(tree.right)
-    else:
-        return str(tree)
+    # The infix text of the tree, from an in-order walk with an explicit stack.
+    # A function is pushed as a one-element tuple, which no terminal is.
+    if isinstance(tree, FlatTree):
+        tree = tree.to_tree()
+    parts = []
+    stack = [tree]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, BinaryTree):
+            stack.append(item.right)
+            stack.append((item.node,))
+            stack.append(item.left)
+        elif isinstance(item, tuple):
+            parts.append(str(item[0]))
+        else:
+            parts.append(str(item))
+    return " ".join(parts)
+
+def _prefix_symbols(tree):
+    # (is_function, symbol) for each node of a BinaryTree in prefix order.
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, BinaryTree):
+            yield True, node.node
+            stack.append(node.right)
+            stack.append(node.left)
+        else:
+            yield False, node
+
+def _prefix_string(symbols):
+    # The text (node left right) of a tree given as (is_function, symbol) pairs
+    # in prefix order. pending holds, for each open function, the number of its
+    # children still to come; a terminal that completes functions closes them.
+    parts = []
+    pending = []
+    for is_function, symbol in symbols:
+        if is_function:
+            parts.append("(" + str(symbol))
+            pending.append(2)
+            continue
+        parts.append(str(symbol))
+        while pending:
+            pending[-1] -= 1
+            if pending[-1]:
+                break
+            pending.pop()
+            parts[-1] += ")"
+    return " ".join(parts)
 
-def fitness(tree):
+def fitness(tree, cache = None, simplified = False):
+    result = evaluate_tree(tree, cache = cache, simplified = simplified)
+    if result != result:
+        return PENALTY
     try:
-        result = eval(tostring(tree))
-        ret_val = abs(10 - result) / 10
-    except:
-        ret_val = 1000000
-    return ret_val
+        return abs(10 - result) / 10
+    except OverflowError:
+        return PENALTY
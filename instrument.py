@@ -0,0 +1,221 @@
+#!/bin/python3
+
+##### Importing Modules #####
+### Builtin Modules ###
+import sys
+import time
+import functools
+### Package Modules ###
+import evaluation
+import selection
+import genetic
+import genetic_prog
+
+##### Constants #####
+# The hot paths a Profiler times, as (owner, attribute, phase). Several
+# attributes may share a phase, e.g. the crossover of both GP representations.
+# Nothing here is touched until a profiler is enabled, so a run without one
+# pays nothing at all.
+HOT_PATHS = [(evaluation, "evaluate", "evaluate"),
+             (selection, "best", "selection.best"),
+             (selection.Tournament, "select", "selection.select"),
+             (selection.LinearRank, "select", "selection.select"),
+             (selection.StochasticUniversal, "select", "selection.select"),
+             (genetic.Population, "new_population", "ga.new_population"),
+             (genetic.Population, "_finish_init", "ga.finish_init"),
+             (genetic.Population, "_evaluate", "ga.evaluate"),
+             (genetic.Population, "individuals", "ga.sort"),
+             (genetic.ArrayPopulation, "new_population", "ga.new_population"),
+             (genetic.ArrayPopulation, "_evaluate", "ga.evaluate"),
+             (genetic.ArrayPopulation, "_sort", "ga.sort"),
+             (genetic.Individual, "crossover", "ga.crossover"),
+             (genetic.Individual, "mutate", "ga.mutate"),
+             (genetic.CompactPopulation, "new_population", "ga.new_population"),
+             (genetic.CompactIndividual, "crossover_into", "ga.crossover"),
+             (genetic.CompactIndividual, "mutate", "ga.mutate"),
+             (genetic_prog.Population, "new_population", "gp.new_population"),
+             (genetic_prog.Population, "eval", "gp.evaluate"),
+             (genetic_prog.Population, "individuals", "gp.sort"),
+             (genetic_prog.Individual, "crossover", "gp.crossover"),
+             (genetic_prog.Individual, "mutate_funcs", "gp.mutate_funcs"),
+             (genetic_prog.Individual, "mutate_terms", "gp.mutate_terms"),
+             (genetic_prog.Individual, "prune", "gp.prune"),
+             (genetic_prog.Individual, "insert", "gp.insert"),
+             (genetic_prog.FlatIndividual, "crossover", "gp.crossover"),
+             (genetic_prog.FlatIndividual, "mutate_funcs", "gp.mutate_funcs"),
+             (genetic_prog.FlatIndividual, "mutate_terms", "gp.mutate_terms"),
+             (genetic_prog.FlatIndividual, "prune", "gp.prune"),
+             (genetic_prog.FlatIndividual, "insert", "gp.insert"),
+             (genetic_prog, "replace_subtree", "gp.copy"),
+             (genetic_prog.Program, "__init__", "gp.compile")]
+# The snapshot functions of the streams, wrapped to attach each generation's profile.
+_SNAPSHOTS = [genetic, genetic_prog]
+
+##### Classes #####
+### Phase Statistics Class ###
+class PhaseStats(object):
+    """Class to hold what a profiler measured for one phase.
+
+    Provides the following public attributes:
+    calls -- The number of calls.
+    total -- The seconds spent in the phase, including phases it called.
+    own -- The seconds spent in the phase itself, excluding the other phases it called.
+    net_blocks -- The net change in allocated memory blocks the phase itself left behind, from
+    sys.getallocatedblocks. This is not an allocation count: a phase that allocates and frees the same
+    objects shows zero, and one that frees more than it allocates shows a negative number.
+    """
+    __slots__ = ("calls", "total", "own", "net_blocks")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.own = 0.0
+        self.net_blocks = 0
+
+    def as_dict(self):
+        """Return the statistics as a dictionary."""
+        return {"calls": self.calls, "total": self.total, "own": self.own, "net_blocks": self.net_blocks}
+
+### Profiler Class ###
+class Profiler(object):
+    """Class to time the hot paths of the genetic and genetic_prog modules.
+
+    Enabling a profiler wraps every function listed in HOT_PATHS, and disabling
+    it puts the originals back, so instrumentation costs nothing unless it is in
+    use. Phases nest: the time and net memory blocks of a phase called from another
+    are counted in the caller's total but not in its own share. While enabled,
+    every snapshot yielded by genetic.stream or genetic_prog.stream carries the
+    statistics of its generation in its profile attribute.
+
+    Provides the following public methods:
+    enable -- Start instrumenting.
+    disable -- Stop instrumenting.
+    collect -- Return the statistics recorded since the last collect, and start a new period.
+    report -- Return a table of the statistics recorded since the profiler was enabled.
+
+    Provides the following public attributes:
+    totals -- A dictionary mapping each phase to its PhaseStats since the profiler was enabled.
+    allocations -- A boolean, true if the net change in memory blocks is tracked.
+
+    This class can be used as a context manager, which enables it on entry and disables it on exit.
+    """
+    def __init__(self, allocations = True):
+        """Initialize the profiler.
+
+        Usage:
+        __init__([allocations])
+
+        Parameters:
+        allocations -- A boolean, if false do not track the net change in memory blocks. Defaults to true.
+        """
+        self.allocations = allocations
+        self.totals = {}
+        self._period = {}
+        self._stack = []
+        self._originals = []
+
+    def enable(self):
+        """Start instrumenting the hot paths."""
+        global _active
+        if _active is not None:
+            raise RuntimeError("another profiler is already enabled")
+        _active = self
+        for owner, attribute, phase in HOT_PATHS:
+            original = vars(owner)[attribute]
+            self._originals.append((owner, attribute, original))
+            if isinstance(original, property):
+                wrapped = property(self._wrap(original.fget, phase), original.fset, original.fdel, original.__doc__)
+            else:
+                wrapped = self._wrap(original, phase)
+            setattr(owner, attribute, wrapped)
+        for module in _SNAPSHOTS:
+            self._originals.append((module, "_snapshot", module._snapshot))
+            module._snapshot = self._wrap_snapshot(module._snapshot)
+
+    def disable(self):
+        """Stop instrumenting and restore the original functions."""
+        global _active
+        for owner, attribute, original in reversed(self._originals):
+            setattr(owner, attribute, original)
+        self._originals = []
+        self._stack = []
+        _active = None
+
+    def collect(self):
+        """Return a dictionary mapping each phase to its PhaseStats since the last collect."""
+        period = self._period
+        self._period = {}
+        return period
+
+    def report(self):
+        """Return a table of the statistics recorded since the profiler was enabled, slowest first."""
+        lines = ["{0:<20} {1:>10} {2:>12} {3:>12} {4:>10}".format("phase", "calls", "total s", "own s", "net blocks")]
+        for phase, stats in sorted(self.totals.items(), key = lambda item: item[1].own, reverse = True):
+            lines.append("{0:<20} {1:>10} {2:>12.6f} {3:>12.6f} {4:>10}".format(phase, stats.calls, stats.total,
+                                                                                stats.own, stats.net_blocks))
+        return "\n".join(lines)
+
+    def _wrap(self, func, phase):
+        clock = time.perf_counter
+        blocks = sys.getallocatedblocks if self.allocations else _no_blocks
+        stack = self._stack
+        record = self._record
+        depth = [0]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if depth[0]:
+                # A recursive call is part of the outermost one.
+                return func(*args, **kwargs)
+            depth[0] += 1
+            frame = [0.0, 0]
+            stack.append(frame)
+            start_blocks = blocks()
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                left = blocks() - start_blocks
+                stack.pop()
+                depth[0] -= 1
+                if stack:
+                    stack[-1][0] += elapsed
+                    stack[-1][1] += left
+                record(phase, elapsed, elapsed - frame[0], left - frame[1])
+        return wrapper
+
+    def _wrap_snapshot(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            snapshot = func(*args, **kwargs)
+            snapshot.profile = {phase: stats.as_dict() for phase, stats in self.collect().items()}
+            return snapshot
+        return wrapper
+
+    def _record(self, phase, total, own, net_blocks):
+        for table in (self.totals, self._period):
+            stats = table.get(phase)
+            if stats is None:
+                stats = table[phase] = PhaseStats()
+            stats.calls += 1
+            stats.total += total
+            stats.own += own
+            stats.net_blocks += net_blocks
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+
+##### Functions #####
+def active():
+    """Return the enabled profiler, or None."""
+    return _active
+
+def _no_blocks():
+    return 0
+
+_active = None
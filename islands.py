@@ -0,0 +1,509 @@
+#!/bin/python3
+
+##### Importing Modules #####
+### Builtin Modules ###
+import copy
+import array
+import struct
+import itertools
+import traceback
+import multiprocessing
+### Third Party Modules ###
+try:
+    import numpy
+except ImportError:
+    numpy = None
+### Package Modules ###
+import genetic
+import genetic_prog
+import randomness
+
+##### Constants #####
+# Migrant messages are a small header followed by raw little-endian arrays, so
+# k chromosomes cost 8 bytes a gene instead of a pickled list of objects.
+_HEADER = struct.Struct("<II")
+TOPOLOGIES = ("ring", "complete")
+
+##### Classes #####
+### Island Classes ###
+## Genetic Algorithm Island Class ##
+class GeneticIsland(object):
+    """Class to describe one island of a genetic algorithm island model.
+
+    An island holds only its settings until start is called in the process that
+    evolves it, so it is cheap to send to a worker.
+
+    Provides the following public methods:
+    start -- Create the island's population.
+    evolve -- Evolve the island's population for some generations.
+    emigrants -- Return the island's best individuals as a compact message.
+    immigrate -- Replace the island's worst individuals with the ones in a message.
+    best -- Return the fitness and chromosome of the island's fittest individual.
+
+    Provides the following public attributes:
+    population -- The island's current population, or None before start is called.
+    maximize -- A boolean, true if higher fitnesses are better.
+    """
+    def __init__(self, n_individuals, individual_length, fitness_func, preserve_percent, non_optimal = 0,
+                 mutation_percent = 0.05, gene_max = 100, maximize = False, population_class = genetic.Population,
+                 batch_fitness = False, cache = None, strategy = None):
+        """Initialize the island's settings.
+
+        Usage:
+        __init__(n_individuals, individual_length, fitness_func, preserve_percent[, non_optimal, mutation_percent, gene_max, maximize, population_class, batch_fitness, cache, strategy])
+
+        Parameters:
+        n_individuals -- The number of individuals on the island.
+        individual_length -- The length of the chromosome of each individual.
+        fitness_func -- A function that takes a chromosome and returns its fitness. Must be picklable to run in a worker process.
+        preserve_percent -- The proportion of best performers to use as the parents of the next generation.
+        non_optimal -- The proportion of randomly selected individuals to add to the pool of parents. Defaults to 0.
+        mutation_percent -- The probability of a given location on a chromosome mutating. Defaults to 0.05.
+        gene_max -- The maximum value to use on any location of a chromosome. Defaults to 100.
+        maximize -- A boolean to control whether to maximize or minimize the fitness function. Defaults to false.
+        population_class -- The population class to evolve: genetic.Population, genetic.CompactPopulation or genetic.ArrayPopulation. Defaults to Population.
+        batch_fitness -- A boolean, if true fitness_func evaluates a whole generation's chromosomes in one call. Defaults to false.
+        cache -- An evaluation.FitnessCache; each island gets its own copy. Defaults to no cache.
+        strategy -- A selection strategy from the selection module used to pick parents. Defaults to uniform choice among the preserved parents.
+        """
+        self.n_individuals = n_individuals
+        self.individual_length = individual_length
+        self.fitness_func = fitness_func
+        self.preserve_percent = preserve_percent
+        self.non_optimal = non_optimal
+        self.mutation_percent = mutation_percent
+        self.gene_max = gene_max
+        self.maximize = maximize
+        self.population_class = population_class
+        self.batch_fitness = batch_fitness
+        self.cache = cache
+        self.strategy = strategy
+        self.population = None
+
+    def start(self, rng):
+        """Create the island's population.
+
+        Usage:
+        start(rng)
+
+        Parameters:
+        rng -- The randomness.RNG the island's population draws every random number from.
+        """
+        self.population = self.population_class(self.n_individuals, self.individual_length, self.gene_max,
+                                                self.fitness_func, self.maximize, self.batch_fitness,
+                                                cache = self.cache, rng = rng)
+
+    def evolve(self, n_generations):
+        """Evolve the island's population for some generations.
+
+        Usage:
+        evolve(n_generations)
+
+        Parameters:
+        n_generations -- The number of generations to evolve for.
+        """
+        self.population = genetic.generations(n_generations, self.population, self.preserve_percent,
+                                              self.non_optimal, self.mutation_percent, self.strategy)
+
+    def emigrants(self, n_migrants):
+        """Return the island's n_migrants best individuals as a compact message.
+
+        Usage:
+        emigrants(n_migrants)
+
+        Parameters:
+        n_migrants -- The number of individuals to send.
+        """
+        population = self.population
+        if isinstance(population, genetic.ArrayPopulation):
+            return pack_chromosomes(population.chromosomes[:n_migrants], population.fitnesses[:n_migrants])
+        best = population.individuals[:n_migrants]
+        return pack_chromosomes([individual.chromosome for individual in best],
+                                [individual.fitness for individual in best])
+
+    def immigrate(self, messages):
+        """Replace the island's worst individuals with the ones in some messages.
+
+        Usage:
+        immigrate(messages)
+
+        Parameters:
+        messages -- A list of messages returned by the emigrants method of other islands.
+        """
+        chromosomes, fitnesses = _unpack_all(unpack_chromosomes, messages)
+        if not fitnesses:
+            return
+        population = self.population
+        n_kept = max(population.n_individuals - len(fitnesses), 0)
+        if isinstance(population, genetic.ArrayPopulation):
+            immigrants = numpy.asarray(chromosomes, dtype = population.chromosomes.dtype)
+            chromosomes = numpy.concatenate((population.chromosomes[:n_kept],
+                                             immigrants.reshape(-1, population.length)))
+            fitnesses = numpy.concatenate((population.fitnesses[:n_kept], numpy.asarray(fitnesses, dtype = float)))
+            self.population = genetic.New_ArrayPopulation(
+                chromosomes[:population.n_individuals], fitnesses[:population.n_individuals], population.gene_max,
+                population.fitness_func, population.maximize, population.batch_fitness, population.evaluator,
+                population.cache, population.rng)
+            return
+        if isinstance(population, genetic.CompactPopulation):
+            immigrants = [genetic.CompactIndividual(chromosome, population.config, fitness)
+                          for chromosome, fitness in zip(chromosomes, fitnesses)]
+            individuals = population.individuals[:n_kept] + immigrants
+            self.population = genetic.New_CompactPopulation(
+                population.n_individuals, individuals[:population.n_individuals], population.config,
+                population.maximize, population.batch_fitness, population.evaluator, population.cache,
+                rng = population.rng)
+            return
+        immigrants = [genetic.NewIndividual(chromosome, self.gene_max, self.fitness_func, fitness)
+                      for chromosome, fitness in zip(chromosomes, fitnesses)]
+        individuals = population.individuals[:n_kept] + immigrants
+        self.population = genetic.New_Population(population.n_individuals, individuals[:population.n_individuals],
+                                                 population.maximize, population.batch_fitness,
+                                                 population.evaluator, population.cache, population.rng)
+
+    def best(self):
+        """Return the fitness and chromosome of the island's fittest individual."""
+        fittest = self.population.fittest
+        return fittest.fitness, list(fittest.chromosome)
+
+## Genetic Programming Island Class ##
+class ProgramIsland(object):
+    """Class to describe one island of a genetic programming island model.
+
+    Migrants travel as the codes of their FlatTree, whichever tree
+    representation the island evolves.
+
+    Provides the same public methods and attributes as the GeneticIsland class.
+    """
+    maximize = False
+
+    def __init__(self, n_individuals, max_depth, fitness_func, preserve_percent, non_optimal = 0,
+                 mutation_percent = 0.05, flat = False, strategy = None):
+        """Initialize the island's settings.
+
+        Usage:
+        __init__(n_individuals, max_depth, fitness_func, preserve_percent[, non_optimal, mutation_percent, flat, strategy])
+
+        Parameters:
+        n_individuals -- The number of individuals on the island.
+        max_depth -- The maximum depth of the initial trees.
+        fitness_func -- A function that takes a tree and returns its fitness, lower is better. Must be picklable to run in a worker process.
+        preserve_percent -- The proportion of best performers to use as the parents of the next generation.
+        non_optimal -- The proportion of randomly selected individuals to add to the pool of parents. Defaults to 0.
+        mutation_percent -- The probability of each mutation at a given node. Defaults to 0.05.
+        flat -- A boolean, if true evolve FlatTree individuals. Defaults to false.
+        strategy -- A selection strategy from the selection module used to pick parents. Defaults to uniform choice among the preserved parents.
+        """
+        self.n_individuals = n_individuals
+        self.max_depth = max_depth
+        self.fitness_func = fitness_func
+        self.preserve_percent = preserve_percent
+        self.non_optimal = non_optimal
+        self.mutation_percent = mutation_percent
+        self.flat = flat
+        self.strategy = strategy
+        self.population = None
+
+    def start(self, rng):
+        self.population = genetic_prog.Population(self.n_individuals, self.max_depth, flat = self.flat, rng = rng)
+        self.population.eval(self.fitness_func)
+
+    def evolve(self, n_generations):
+        for i in range(0, n_generations):
+            self.population = self.population.new_population(self.preserve_percent, self.non_optimal,
+                                                             self.mutation_percent, self.strategy)
+            self.population.eval(self.fitness_func)
+
+    def emigrants(self, n_migrants):
+        best = self.population.individuals[:n_migrants]
+        return pack_trees([individual.tree for individual in best], [individual.fitness for individual in best])
+
+    def immigrate(self, messages):
+        trees, fitnesses = _unpack_all(unpack_trees, messages)
+        if not fitnesses:
+            return
+        population = self.population
+        n_kept = max(population.n_individuals - len(fitnesses), 0)
+        immigrants = []
+        for tree, fitness in zip(trees, fitnesses):
+            if self.flat:
+                immigrant = genetic_prog.NewFlatIndividual(tree)
+            else:
+                immigrant = genetic_prog.NewIndividual(tree.to_tree())
+            immigrant.fitness = fitness
+            immigrants.append(immigrant)
+        individuals = population.individuals[:n_kept] + immigrants
+        self.population = genetic_prog.NewPopulation(population.n_individuals,
+                                                     individuals[:population.n_individuals], population.evaluator,
+                                                     population.parsimony, population.lexicographic, population.rng)
+
+    def best(self):
+        fittest = self.population.individuals[0]
+        return fittest.fitness, fittest.tree
+
+### Island Model Class ###
+class IslandModel(object):
+    """Class to evolve several islands in parallel and migrate individuals between them.
+
+    Each island runs in its own worker process and keeps its population there
+    between epochs. An epoch evolves every island for interval generations, then
+    sends the best n_migrants of each island to its neighbours in the topology,
+    where they replace the worst individuals. Every island draws from its own
+    stream, spawned from a randomness.RNG seeded with seed, and migration waits
+    for all islands, so a run is deterministic for a seed whether the islands
+    run in processes or one after another.
+
+    Provides the following public methods:
+    run -- Run the model for some epochs.
+    best -- Return the fitness and genome of the fittest individual of all islands.
+    close -- Stop the worker processes.
+
+    Provides the following public attributes:
+    n_islands -- The number of islands.
+    history -- A list with, for each epoch run, a list of the best fitness of each island.
+
+    This class can be used as a context manager, which calls close on exit.
+    """
+    def __init__(self, island, n_islands, seed = 0, topology = "ring", n_migrants = 1, interval = 10,
+                 processes = True):
+        """Initialize the model and start the islands.
+
+        Usage:
+        __init__(island, n_islands[, seed, topology, n_migrants, interval, processes])
+
+        Parameters:
+        island -- A GeneticIsland or ProgramIsland; every island is a copy of it.
+        n_islands -- The number of islands.
+        seed -- An integer the random streams of the islands are spawned from. Defaults to 0.
+        topology -- "ring" to send migrants to the next island, "complete" to send them to every other island, or a function taking the number of islands and returning, for each island, the list of islands it receives from. Defaults to "ring".
+        n_migrants -- The number of individuals each island sends per migration. Defaults to 1.
+        interval -- The number of generations between migrations. Defaults to 10.
+        processes -- A boolean, if false run the islands one after another in this process. Defaults to true.
+        """
+        self.n_islands = n_islands
+        self.n_migrants = n_migrants
+        self.interval = interval
+        self.maximize = island.maximize
+        self.sources = _sources(topology, n_islands)
+        self.history = []
+        streams = randomness.RNG(seed).spawn(n_islands)
+        if processes:
+            self._islands = [_RemoteIsland(island, rng) for rng in streams]
+        else:
+            self._islands = [_LocalIsland(copy.deepcopy(island), rng) for rng in streams]
+        # Wait for every island to create its population.
+        self._gather()
+
+    def run(self, n_epochs):
+        """Run the model for some epochs and return the fitness and genome of the fittest individual.
+
+        Usage:
+        run(n_epochs)
+
+        Parameters:
+        n_epochs -- The number of epochs, each of interval generations followed by a migration.
+        """
+        for epoch in range(0, n_epochs):
+            # Every command is sent to all islands before any reply is read, so the
+            # islands work in parallel and the main process only waits at barriers.
+            self._broadcast("evolve", self.interval)
+            self._gather()
+            self._broadcast("emigrants", self.n_migrants)
+            messages = self._gather()
+            for island, sources in zip(self._islands, self.sources):
+                island.send("immigrate", [messages[source] for source in sources])
+            self._gather()
+            self._broadcast("best")
+            self.history.append([fitness for fitness, genome in self._gather()])
+        return self.best()
+
+    def best(self):
+        """Return the fitness and genome of the fittest individual of all islands."""
+        self._broadcast("best")
+        choose = max if self.maximize else min
+        return choose(self._gather(), key = lambda result: result[0])
+
+    def _broadcast(self, command, argument = None):
+        for island in self._islands:
+            island.send(command, argument)
+
+    def _gather(self):
+        return [island.receive() for island in self._islands]
+
+    def close(self):
+        """Stop the worker processes."""
+        for island in self._islands:
+            island.close()
+        self._islands = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+## Island Handle Classes ##
+class _LocalIsland(object):
+    # Each island draws only from its own RNG, so islands sharing a process
+    # draw the same numbers as they would in processes of their own.
+    def __init__(self, island, rng):
+        self.island = island
+        self.island.start(rng)
+        self.reply = None
+
+    def send(self, command, argument = None):
+        if argument is None:
+            self.reply = getattr(self.island, command)()
+        else:
+            self.reply = getattr(self.island, command)(argument)
+
+    def receive(self):
+        return self.reply
+
+    def close(self):
+        pass
+
+class _RemoteIsland(object):
+    def __init__(self, island, rng):
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target = _serve, args = (island, rng, child_connection),
+                                               daemon = True)
+        self.process.start()
+        child_connection.close()
+
+    def send(self, command, argument = None):
+        self.connection.send((command, argument))
+
+    def receive(self):
+        ok, reply = self.connection.recv()
+        if not ok:
+            raise RuntimeError("island worker failed:\n" + reply)
+        return reply
+
+    def close(self):
+        if self.process.is_alive():
+            self.connection.send(None)
+            self.process.join()
+        self.connection.close()
+
+##### Functions #####
+### Worker Functions ###
+def _serve(island, rng, connection):
+    try:
+        island.start(rng)
+        connection.send((True, None))
+    except Exception:
+        connection.send((False, traceback.format_exc()))
+        return
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        command, argument = message
+        try:
+            if argument is None:
+                reply = getattr(island, command)()
+            else:
+                reply = getattr(island, command)(argument)
+            connection.send((True, reply))
+        except Exception:
+            connection.send((False, traceback.format_exc()))
+
+def _sources(topology, n_islands):
+    if callable(topology):
+        return [list(sources) for sources in topology(n_islands)]
+    if topology == "ring":
+        return [[(index - 1) % n_islands] if n_islands > 1 else [] for index in range(0, n_islands)]
+    if topology == "complete":
+        return [[source for source in range(0, n_islands) if source != index] for index in range(0, n_islands)]
+    raise ValueError("unknown topology " + repr(topology) + ", expected one of " + str(TOPOLOGIES))
+
+def _unpack_all(unpack, messages):
+    genomes = []
+    fitnesses = []
+    for message in messages:
+        message_genomes, message_fitnesses = unpack(message)
+        genomes.extend(message_genomes)
+        fitnesses.extend(message_fitnesses)
+    return genomes, fitnesses
+
+### Serialization Functions ###
+def pack_chromosomes(chromosomes, fitnesses):
+    """Return chromosomes of equal length and their fitnesses packed into bytes.
+
+    Usage:
+    pack_chromosomes(chromosomes, fitnesses)
+
+    Parameters:
+    chromosomes -- A sequence of lists of integers, or a 2-D array.
+    fitnesses -- A sequence with the fitness of each chromosome.
+    """
+    n_chromosomes = len(fitnesses)
+    length = len(chromosomes[0]) if n_chromosomes else 0
+    if hasattr(chromosomes, "astype"):
+        genes = chromosomes.astype("<i8").tobytes()
+    else:
+        genes = array.array("q", itertools.chain.from_iterable(chromosomes)).tobytes()
+    return _HEADER.pack(n_chromosomes, length) + genes + array.array("d", fitnesses).tobytes()
+
+def unpack_chromosomes(message):
+    """Return the lists of chromosomes and fitnesses packed by pack_chromosomes.
+
+    Usage:
+    unpack_chromosomes(message)
+
+    Parameters:
+    message -- Bytes returned by pack_chromosomes.
+    """
+    n_chromosomes, length = _HEADER.unpack_from(message)
+    genes = array.array("q")
+    genes.frombytes(message[_HEADER.size:_HEADER.size + 8 * n_chromosomes * length])
+    fitnesses = array.array("d")
+    fitnesses.frombytes(message[_HEADER.size + 8 * n_chromosomes * length:])
+    chromosomes = [genes[start:start + length].tolist() for start in range(0, n_chromosomes * length, length)]
+    return chromosomes, fitnesses.tolist()
+
+def pack_trees(trees, fitnesses):
+    """Return trees and their fitnesses packed into bytes as FlatTree codes.
+
+    Usage:
+    pack_trees(trees, fitnesses)
+
+    Parameters:
+    trees -- A sequence of BinaryTree, FlatTree or terminal trees.
+    fitnesses -- A sequence with the fitness of each tree.
+    """
+    lengths = array.array("q")
+    codes = array.array("q")
+    for tree in trees:
+        if not isinstance(tree, genetic_prog.FlatTree):
+            tree = genetic_prog.FlatTree.from_tree(tree)
+        lengths.append(len(tree.codes))
+        codes.fromlist(tree.codes.tolist())
+    return (_HEADER.pack(len(lengths), len(codes)) + lengths.tobytes() + codes.tobytes()
+            + array.array("d", fitnesses).tobytes())
+
+def unpack_trees(message):
+    """Return the lists of FlatTrees and fitnesses packed by pack_trees.
+
+    Usage:
+    unpack_trees(message)
+
+    Parameters:
+    message -- Bytes returned by pack_trees.
+    """
+    n_trees, n_codes = _HEADER.unpack_from(message)
+    start = _HEADER.size
+    lengths = array.array("q")
+    lengths.frombytes(message[start:start + 8 * n_trees])
+    start += 8 * n_trees
+    codes = array.array("q")
+    codes.frombytes(message[start:start + 8 * n_codes])
+    fitnesses = array.array("d")
+    fitnesses.frombytes(message[start + 8 * n_codes:])
+    trees = []
+    position = 0
+    for length in lengths:
+        trees.append(genetic_prog.FlatTree(codes[position:position + length]))
+        position += length
+    return trees, fitnesses.tolist()
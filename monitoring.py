@@ -0,0 +1,391 @@
+#!/bin/python3
+
+##### Importing Modules #####
+### Builtin Modules ###
+import math
+
+##### Classes #####
+### Snapshot Class ###
+class Snapshot(object):
+    """Class to hold the statistics of one generation of a run.
+
+    A snapshot keeps a reference to its population rather than a copy, so
+    streaming a run costs a few numbers per generation. The diversity, which
+    takes a pass over every individual, is only computed when it is first read.
+
+    Provides the following public methods:
+    as_dict -- Return the statistics as a dictionary, without the population.
+
+    Provides the following public attributes:
+    generation -- The number of generations evolved before this one.
+    best_fitness -- The fitness of the fittest individual.
+    avg_fitness -- The average of the finite fitnesses of the population (see mean).
+    std_fitness -- The standard deviation of the finite fitnesses of the population.
+    diversity -- The proportion of distinct individuals in the population, computed from the population on first read.
+    evaluations -- The number of fitness function calls creating the generation took.
+    timings -- A dictionary mapping each phase ("breed", "evaluate") to the seconds it took.
+    elapsed -- The wall time, in seconds, between the previous snapshot and this one.
+    population -- The population itself.
+    profile -- A dictionary of the per-phase statistics of the generation when an instrument.Profiler is enabled, otherwise None.
+    """
+    __slots__ = ("generation", "best_fitness", "avg_fitness", "std_fitness", "_diversity", "evaluations",
+                 "timings", "elapsed", "population", "profile")
+
+    def __init__(self, generation, best_fitness, avg_fitness, std_fitness, diversity, evaluations, timings,
+                 elapsed, population, profile = None):
+        self.generation = generation
+        self.best_fitness = best_fitness
+        self.avg_fitness = avg_fitness
+        self.std_fitness = std_fitness
+        self._diversity = diversity
+        self.evaluations = evaluations
+        self.timings = timings
+        self.elapsed = elapsed
+        self.population = population
+        self.profile = profile
+
+    @property
+    def diversity(self):
+        if self._diversity is None:
+            self._diversity = self.population.diversity()
+        return self._diversity
+
+    def as_dict(self):
+        """Return the statistics as a dictionary, without the population."""
+        return {name.lstrip("_"): getattr(self, name.lstrip("_")) for name in self.__slots__ if name != "population"}
+
+    def __str__(self):
+        return ("generation {0}: best {1}, average {2:.6g}, std {3:.6g}, diversity {4:.3f}, "
+                "{5} evaluations in {6:.3g} s").format(self.generation, self.best_fitness, self.avg_fitness,
+                                                       self.std_fitness, self.diversity, self.evaluations,
+                                                       self.elapsed)
+
+### Stopping Criterion Classes ###
+## Base Criterion Class ##
+class Criterion(object):
+    """Class to decide from a stream of snapshots when a run should stop.
+
+    A criterion is called with each snapshot in turn and returns true once the
+    run should stop. Any function taking a snapshot can be used the same way;
+    get_state and set_state let a checkpointed run resume a criterion's
+    progress. Only the attributes a subclass lists in _progress are saved, not
+    the settings it was created with, so a resumed run keeps the settings of
+    the criteria it is given.
+
+    Provides the following public methods:
+    get_state -- Return the criterion's state as a JSON serializable dictionary.
+    set_state -- Restore a state returned by get_state.
+    """
+    _progress = ()
+
+    def __call__(self, snapshot):
+        return False
+
+    def get_state(self):
+        """Return the criterion's progress as a JSON serializable dictionary."""
+        return {name: getattr(self, name) for name in self._progress}
+
+    def set_state(self, state):
+        """Restore a state returned by get_state.
+
+        Usage:
+        set_state(state)
+
+        Parameters:
+        state -- A dictionary returned by get_state.
+        """
+        for name in self._progress:
+            if name in state:
+                setattr(self, name, state[name])
+
+## Max Generations Class ##
+class MaxGenerations(Criterion):
+    """Class to stop a run after a number of generations."""
+    def __init__(self, n_generations):
+        """Initialize the criterion.
+
+        Usage:
+        __init__(n_generations)
+
+        Parameters:
+        n_generations -- The number of generations to evolve.
+        """
+        self.n_generations = n_generations
+
+    def __call__(self, snapshot):
+        return snapshot.generation >= self.n_generations
+
+## Target Fitness Class ##
+class TargetFitness(Criterion):
+    """Class to stop a run once the best fitness reaches a target."""
+    def __init__(self, target, maximize = False):
+        """Initialize the criterion.
+
+        Usage:
+        __init__(target[, maximize])
+
+        Parameters:
+        target -- The fitness to reach.
+        maximize -- A boolean, true if higher fitnesses are better. Defaults to false.
+        """
+        self.target = target
+        self.maximize = maximize
+
+    def __call__(self, snapshot):
+        if self.maximize:
+            return snapshot.best_fitness >= self.target
+        return snapshot.best_fitness <= self.target
+
+## Stagnation Class ##
+class Stagnation(Criterion):
+    """Class to stop a run once the best fitness has not improved for some generations."""
+    _progress = ("best", "waited")
+
+    def __init__(self, patience, maximize = False, tolerance = 0):
+        """Initialize the criterion.
+
+        Usage:
+        __init__(patience[, maximize, tolerance])
+
+        Parameters:
+        patience -- The number of generations without improvement to allow.
+        maximize -- A boolean, true if higher fitnesses are better. Defaults to false.
+        tolerance -- The smallest change counted as an improvement. Defaults to 0.
+        """
+        self.patience = patience
+        self.maximize = maximize
+        self.tolerance = tolerance
+        self.best = None
+        self.waited = 0
+
+    def __call__(self, snapshot):
+        fitness = snapshot.best_fitness
+        if self.best is None or _improves(fitness, self.best, self.maximize, self.tolerance):
+            self.best = fitness
+            self.waited = 0
+            return False
+        self.waited += 1
+        return self.waited >= self.patience
+
+## Average Stalls Class ##
+class AverageStalls(Criterion):
+    """Class to stop a run as soon as the average fitness fails to improve on the previous generation's.
+
+    This is the convergence test genetic.evolve uses by default.
+    """
+    _progress = ("last_fitness",)
+
+    def __init__(self, maximize = False):
+        """Initialize the criterion.
+
+        Usage:
+        __init__([maximize])
+
+        Parameters:
+        maximize -- A boolean, true if higher fitnesses are better. Defaults to false.
+        """
+        self.maximize = maximize
+        self.last_fitness = None
+
+    def __call__(self, snapshot):
+        last_fitness = self.last_fitness
+        self.last_fitness = snapshot.avg_fitness
+        return last_fitness is not None and not _improves(snapshot.avg_fitness, last_fitness, self.maximize)
+
+## Moving Average Class ##
+class MovingAverage(Criterion):
+    """Class to stop a run once the average fitness is no better than its mean over the previous generations.
+
+    This is the convergence test genetic_prog.evolve uses by default.
+    """
+    def __init__(self, window = 5, maximize = False):
+        """Initialize the criterion.
+
+        Usage:
+        __init__([window, maximize])
+
+        Parameters:
+        window -- The number of previous generations to average over. Defaults to 5.
+        maximize -- A boolean, true if higher fitnesses are better. Defaults to false.
+        """
+        self.window = window
+        self.maximize = maximize
+        self.fitnesses = Queue(window)
+        self.seen = 0
+
+    def __call__(self, snapshot):
+        if self.seen >= self.window:
+            if not _improves(snapshot.avg_fitness, math.fsum(self.fitnesses) / self.window, self.maximize):
+                return True
+        self.fitnesses.append(snapshot.avg_fitness)
+        self.seen += 1
+        return False
+
+    def get_state(self):
+        return {"fitnesses": list(self.fitnesses), "seen": self.seen}
+
+    def set_state(self, state):
+        self.fitnesses = Queue(self.window)
+        for fitness in state["fitnesses"]:
+            self.fitnesses.append(fitness)
+        self.seen = state["seen"]
+
+### Queue Class ###
+class Queue(object):
+    """Class to keep the last few items appended, oldest first.
+
+    The items are stored in a fixed-size ring buffer, so appending overwrites the
+    oldest item in constant time. A new queue is filled with zeros.
+
+    This class provides the methods to be used as a sequence.
+    """
+    def __init__(self, length):
+        """Initialize the queue.
+
+        Usage:
+        __init__(length)
+
+        Parameters:
+        length -- The number of items kept.
+        """
+        self._items = [0] * length
+        self._start = 0
+        self.length = length
+
+    def append(self, item):
+        """Add an item, dropping the oldest one."""
+        if self.length:
+            self._items[self._start] = item
+            self._start = (self._start + 1) % self.length
+
+    def __iter__(self):
+        items = self._items
+        start = self._start
+        for index in range(start, self.length):
+            yield items[index]
+        for index in range(0, start):
+            yield items[index]
+
+    def __str__(self):
+        return str(list(self))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("queue index out of range")
+        return self._items[(self._start + index) % self.length]
+
+    def __len__(self):
+        return self.length
+
+##### Functions #####
+### Stream Functions ###
+def until(snapshots, criteria):
+    """Yield snapshots until one of the criteria says to stop, including that last snapshot.
+
+    Usage:
+    until(snapshots, criteria)
+
+    Parameters:
+    snapshots -- An iterable of snapshots, such as one returned by genetic.stream.
+    criteria -- A list of functions or Criterion objects taking a snapshot and returning true to stop.
+    """
+    for snapshot in snapshots:
+        yield snapshot
+        # Every criterion sees every snapshot, so stateful ones stay in step.
+        if any([criterion(snapshot) for criterion in criteria]):
+            return
+
+def run(snapshots, criteria):
+    """Consume snapshots until one of the criteria says to stop, and return the last snapshot.
+
+    Usage:
+    run(snapshots, criteria)
+
+    Parameters:
+    snapshots -- An iterable of snapshots, such as one returned by genetic.stream.
+    criteria -- A list of functions or Criterion objects taking a snapshot and returning true to stop.
+    """
+    snapshot = None
+    for snapshot in until(snapshots, criteria):
+        pass
+    return snapshot
+
+def get_states(criteria):
+    """Return a list with the state of each criterion, or None for those without get_state.
+
+    Usage:
+    get_states(criteria)
+
+    Parameters:
+    criteria -- A list of functions or Criterion objects.
+    """
+    return [criterion.get_state() if hasattr(criterion, "get_state") else None for criterion in criteria]
+
+def set_states(criteria, states):
+    """Restore the states returned by get_states.
+
+    Usage:
+    set_states(criteria, states)
+
+    Parameters:
+    criteria -- The list of functions or Criterion objects the states were taken from.
+    states -- A list returned by get_states.
+    """
+    for criterion, state in zip(criteria, states):
+        if state is not None:
+            criterion.set_state(state)
+
+### Statistics Functions ###
+def finite(values):
+    """Return a list of the values that are neither infinite nor nan.
+
+    Usage:
+    finite(values)
+
+    Parameters:
+    values -- A sequence of numbers.
+    """
+    # x - x is 0 for any finite int or float, and nan for infinities and nan.
+    return [value for value in values if value - value == 0]
+
+def mean(values):
+    """Return the mean of the finite values.
+
+    Infinite and nan values, such as the penalty of a timed out evaluation, are
+    left out so that a few of them do not hide the progress of the rest. If no
+    value is finite the plain mean is returned.
+
+    Usage:
+    mean(values)
+
+    Parameters:
+    values -- A non-empty sequence of numbers.
+    """
+    kept = finite(values)
+    if not kept:
+        return sum(values) / len(values)
+    return math.fsum(kept) / len(kept)
+
+def std(values, mean):
+    """Return the population standard deviation of the finite values around their mean.
+
+    Usage:
+    std(values, mean)
+
+    Parameters:
+    values -- A sequence of numbers.
+    mean -- The mean of the finite values.
+    """
+    values = finite(values)
+    if not values:
+        return 0.0
+    return math.sqrt(math.fsum((value - mean) ** 2 for value in values) / len(values))
+
+def _improves(fitness, reference, maximize, tolerance = 0):
+    if maximize:
+        return fitness > reference + tolerance
+    return fitness < reference - tolerance
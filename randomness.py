@@ -0,0 +1,284 @@
+#!/bin/python3
+
+##### Importing Modules #####
+### Builtin Modules ###
+import random
+### Third Party Modules ###
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+##### Classes #####
+### Generator Classes ###
+## Explicit Generator Class ##
+class RNG(random.Random):
+    """Class to draw random numbers from an explicit, seeded stream.
+
+    An RNG is a random.Random, so it provides random, randint, randrange, choice,
+    shuffle and the rest, paired with a numpy Generator for the array engines
+    when numpy is installed. Both are seeded from one seed sequence (a numpy
+    SeedSequence when numpy is installed), and spawn derives independent child
+    streams from it, one per worker or island, so a run draws the same numbers
+    however its work is split up. Populations given an RNG draw every random
+    number from it and never touch the global generators.
+
+    Provides the following public methods:
+    uniforms -- Return a list of uniform floats in [0, 1).
+    positions -- Return the indexes of the draws, out of some, that fall under a probability.
+    pick -- Return a list taking each item from one of two sequences at random.
+    randints -- Return a list of integers between two bounds, inclusive.
+    integers -- Return a numpy array of integers.
+    geometric -- Return a numpy array of draws from a geometric distribution.
+    spawn -- Return independent child generators.
+    get_state -- Return the generator's state as a JSON serializable dictionary.
+    set_state -- Restore a state returned by get_state.
+
+    Provides the following public attributes:
+    entropy -- The integer the seed sequence was built from.
+    spawn_key -- A tuple locating this generator among the children spawned from the root entropy.
+    generator -- The numpy Generator, or None without numpy.
+    """
+    def __init__(self, seed = None, spawn_key = ()):
+        """Initialize the generator.
+
+        Usage:
+        __init__([seed, spawn_key])
+
+        Parameters:
+        seed -- A non-negative integer. Defaults to fresh entropy from the operating system.
+        spawn_key -- A tuple of integers, set by spawn for a child generator. Defaults to the root generator.
+        """
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(128)
+        self.entropy = seed
+        self.spawn_key = tuple(spawn_key)
+        self.n_children_spawned = 0
+        if numpy is not None:
+            sequence = numpy.random.SeedSequence(seed, spawn_key = self.spawn_key)
+            self.generator = numpy.random.Generator(numpy.random.PCG64(sequence))
+            python_seed = int.from_bytes(sequence.generate_state(4, numpy.uint64).tobytes(), "little")
+        else:
+            self.generator = None
+            python_seed = repr((seed, self.spawn_key))
+        random.Random.__init__(self, python_seed)
+
+    def uniforms(self, n_draws):
+        """Return a list of n_draws uniform floats in [0, 1), drawn in bulk.
+
+        Usage:
+        uniforms(n_draws)
+
+        Parameters:
+        n_draws -- The number of floats to draw.
+        """
+        if self.generator is not None:
+            return self.generator.random(n_draws).tolist()
+        rand = self.random
+        return [rand() for i in range(0, n_draws)]
+
+    def positions(self, n_draws, probability):
+        """Return a list of the indexes, among n_draws uniform draws, of those below probability.
+
+        This is how the operators pick which genes mutate or cross over: one
+        draw per gene, made in bulk.
+
+        Usage:
+        positions(n_draws, probability)
+
+        Parameters:
+        n_draws -- The number of draws.
+        probability -- The probability of each index being returned.
+        """
+        if self.generator is not None:
+            return numpy.flatnonzero(self.generator.random(n_draws) < probability).tolist()
+        rand = self.random
+        return [index for index in range(0, n_draws) if rand() < probability]
+
+    def pick(self, first, second, probability):
+        """Return a list of the items of second where a uniform draw is below probability, and of first elsewhere.
+
+        The draws are those positions(len(first), probability) would make.
+
+        Usage:
+        pick(first, second, probability)
+
+        Parameters:
+        first -- A sequence.
+        second -- A sequence of the same length.
+        probability -- The probability of each item being taken from second.
+        """
+        if self.generator is not None:
+            picked = list(first)
+            for index in self.positions(len(first), probability):
+                picked[index] = second[index]
+            return picked
+        rand = self.random
+        return [item if rand() < probability else other for other, item in zip(first, second)]
+
+    def randints(self, low, high, n_draws):
+        """Return a list of n_draws integers between low and high, inclusive, drawn in bulk.
+
+        Usage:
+        randints(low, high, n_draws)
+
+        Parameters:
+        low -- The lowest possible integer.
+        high -- The highest possible integer.
+        n_draws -- The number of integers to draw.
+        """
+        if self.generator is not None:
+            return self.generator.integers(low, high + 1, n_draws).tolist()
+        randint = self.randint
+        return [randint(low, high) for i in range(0, n_draws)]
+
+    def integers(self, low, high, size, dtype = None):
+        """Return a numpy array of integers from low up to, but not including, high.
+
+        Usage:
+        integers(low, high, size[, dtype])
+
+        Parameters:
+        low -- The lowest possible integer.
+        high -- One more than the highest possible integer.
+        size -- The shape of the array.
+        dtype -- The numpy dtype of the array. Defaults to int64.
+        """
+        return self.generator.integers(low, high, size, dtype = dtype or numpy.int64)
+
+    def geometric(self, probability, size):
+        """Return a numpy array of the number of trials up to the first success.
+
+        Usage:
+        geometric(probability, size)
+
+        Parameters:
+        probability -- The probability of success of each trial.
+        size -- The shape of the array.
+        """
+        return self.generator.geometric(probability, size)
+
+    def spawn(self, n_children):
+        """Return a list of n_children independent generators derived from this one.
+
+        Spawning again returns new generators, never repeating earlier ones.
+
+        Usage:
+        spawn(n_children)
+
+        Parameters:
+        n_children -- The number of generators to return.
+        """
+        first = self.n_children_spawned
+        self.n_children_spawned += n_children
+        return [RNG(self.entropy, self.spawn_key + (index,)) for index in range(first, first + n_children)]
+
+    def get_state(self):
+        """Return the generator's state as a JSON serializable dictionary."""
+        version, internal_state, gauss = self.getstate()
+        return {"entropy": self.entropy, "spawn_key": list(self.spawn_key), "spawned": self.n_children_spawned,
+                "random": [version, list(internal_state), gauss],
+                "numpy": self.generator.bit_generator.state if self.generator is not None else None}
+
+    def set_state(self, state):
+        """Restore a state returned by get_state.
+
+        Usage:
+        set_state(state)
+
+        Parameters:
+        state -- A dictionary returned by get_state.
+        """
+        self.entropy = state["entropy"]
+        self.spawn_key = tuple(state["spawn_key"])
+        self.n_children_spawned = state["spawned"]
+        version, internal_state, gauss = state["random"]
+        self.setstate((version, tuple(internal_state), gauss))
+        if self.generator is not None and state["numpy"] is not None:
+            self.generator.bit_generator.state = state["numpy"]
+
+    def __reduce__(self):
+        return (from_state, (self.get_state(),))
+
+## Global Generator Class ##
+class GlobalRNG(object):
+    """Class to draw from the global random and numpy.random generators through the RNG interface.
+
+    This is what populations use when they are not given an RNG, so seeding the
+    random module (and numpy.random for the array engines) reproduces a run.
+
+    Provides the same public methods as the RNG class, except spawn returns RNGs
+    seeded from the global generator and get_state returns None.
+    """
+    def __init__(self):
+        self.random = random.random
+        self.randint = random.randint
+        self.randrange = random.randrange
+        self.choice = random.choice
+        self.shuffle = random.shuffle
+
+    def uniforms(self, n_draws):
+        rand = random.random
+        return [rand() for i in range(0, n_draws)]
+
+    def positions(self, n_draws, probability):
+        # The threshold is tested as each number is drawn, without a list of the draws.
+        rand = random.random
+        return [index for index in range(0, n_draws) if rand() < probability]
+
+    def pick(self, first, second, probability):
+        rand = random.random
+        return [item if rand() < probability else other for other, item in zip(first, second)]
+
+    def randints(self, low, high, n_draws):
+        randint = random.randint
+        return [randint(low, high) for i in range(0, n_draws)]
+
+    def integers(self, low, high, size, dtype = None):
+        return numpy.random.randint(low, high, size, dtype = dtype or numpy.int64)
+
+    def geometric(self, probability, size):
+        return numpy.random.geometric(probability, size)
+
+    def spawn(self, n_children):
+        return [RNG(random.getrandbits(128)) for i in range(0, n_children)]
+
+    def get_state(self):
+        return None
+
+    def __reduce__(self):
+        return (_global, ())
+
+##### Functions #####
+def resolve(rng):
+    """Return rng, or the global generator if rng is None.
+
+    Usage:
+    resolve(rng)
+
+    Parameters:
+    rng -- An RNG or None.
+    """
+    if rng is None:
+        return GLOBAL
+    return rng
+
+def from_state(state):
+    """Return an RNG restored from a state returned by get_state, or the global generator if state is None.
+
+    Usage:
+    from_state(state)
+
+    Parameters:
+    state -- A dictionary returned by RNG.get_state, or None.
+    """
+    if state is None:
+        return GLOBAL
+    rng = RNG(state["entropy"], state["spawn_key"])
+    rng.set_state(state)
+    return rng
+
+def _global():
+    return GLOBAL
+
+GLOBAL = GlobalRNG()
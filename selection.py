@@ -0,0 +1,241 @@
+#!/bin/python3
+
+##### Importing Modules #####
+### Builtin Modules ###
+import random
+import math
+import heapq
+import operator
+
+##### Classes #####
+### Sampling Classes ###
+## Alias Table Class ##
+class AliasTable(object):
+    """Class to draw indexes from a discrete distribution in constant time.
+
+    Building the table (Vose's alias method) takes linear time, after which every
+    draw costs two uniform numbers regardless of the number of weights.
+
+    Provides the following public methods:
+    draw -- Draw one index.
+    draws -- Draw a list of indexes.
+    """
+    def __init__(self, weights):
+        """Build the table.
+
+        Usage:
+        __init__(weights)
+
+        Parameters:
+        weights -- A sequence of non-negative weights, at least one of them positive.
+        """
+        n_weights = len(weights)
+        total = sum(weights)
+        scaled = [weight * n_weights / total for weight in weights]
+        self.n_weights = n_weights
+        self.probability = [1.0] * n_weights
+        self.alias = list(range(0, n_weights))
+        small = [index for index, weight in enumerate(scaled) if weight < 1]
+        large = [index for index, weight in enumerate(scaled) if weight >= 1]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+
+    def draw(self, rng = None):
+        """Draw one index.
+
+        Usage:
+        draw([rng])
+
+        Parameters:
+        rng -- A randomness.RNG to draw from. Defaults to the random module.
+        """
+        rand = (rng or random).random
+        index = int(rand() * self.n_weights)
+        if rand() < self.probability[index]:
+            return index
+        return self.alias[index]
+
+    def draws(self, n_draws, rng = None):
+        """Draw a list of indexes.
+
+        Usage:
+        draws(n_draws[, rng])
+
+        Parameters:
+        n_draws -- The number of indexes to draw.
+        rng -- A randomness.RNG to draw from. Defaults to the random module.
+        """
+        draw = self.draw
+        return [draw(rng) for i in range(0, n_draws)]
+
+### Selection Classes ###
+## Tournament Selection Class ##
+class Tournament(object):
+    """Class to select parents by tournament.
+
+    Each parent is the best of a few individuals drawn uniformly at random, so a
+    draw costs the tournament size and no table is needed.
+
+    Provides the following public methods:
+    select -- Draw the indexes of parents.
+    """
+    def __init__(self, size = 2):
+        """Initialize the strategy.
+
+        Usage:
+        __init__([size])
+
+        Parameters:
+        size -- The number of individuals in each tournament. Defaults to 2.
+        """
+        self.size = size
+
+    def select(self, fitnesses, maximize, n_parents, rng = None):
+        """Draw the indexes of parents.
+
+        Usage:
+        select(fitnesses, maximize, n_parents[, rng])
+
+        Parameters:
+        fitnesses -- A sequence with the fitness of every individual of the population.
+        maximize -- A boolean, true if higher fitnesses are better.
+        n_parents -- The number of indexes to draw.
+        rng -- A randomness.RNG to draw from. Defaults to the random module.
+        """
+        n_individuals = len(fitnesses)
+        choose = max if maximize else min
+        rand = (rng or random).random
+        selected = []
+        for i in range(0, n_parents):
+            contenders = [int(rand() * n_individuals) for j in range(0, self.size)]
+            selected.append(choose(contenders, key = fitnesses.__getitem__))
+        return selected
+
+## Linear Rank Selection Class ##
+class LinearRank(object):
+    """Class to select parents with a probability that grows linearly with their rank.
+
+    The ranking and an alias table are built once per call, after which each
+    parent is drawn in constant time.
+
+    Provides the following public methods:
+    select -- Draw the indexes of parents.
+    """
+    def __init__(self, pressure = 1.5):
+        """Initialize the strategy.
+
+        Usage:
+        __init__([pressure])
+
+        Parameters:
+        pressure -- The expected number of draws of the best individual, between 1 and 2. Defaults to 1.5.
+        """
+        self.pressure = pressure
+
+    def select(self, fitnesses, maximize, n_parents, rng = None):
+        """Draw the indexes of parents.
+
+        Usage:
+        select(fitnesses, maximize, n_parents[, rng])
+
+        Parameters:
+        fitnesses -- A sequence with the fitness of every individual of the population.
+        maximize -- A boolean, true if higher fitnesses are better.
+        n_parents -- The number of indexes to draw.
+        rng -- A randomness.RNG to draw from. Defaults to the random module.
+        """
+        n_individuals = len(fitnesses)
+        if n_individuals == 1:
+            return [0] * n_parents
+        # Worst first, so an individual's position is its rank.
+        ranked = sorted(range(0, n_individuals), key = fitnesses.__getitem__, reverse = not maximize)
+        weights = [(2 - self.pressure) + 2 * (self.pressure - 1) * rank / (n_individuals - 1)
+                   for rank in range(0, n_individuals)]
+        if sum(weights) <= 0:
+            weights = [1] * n_individuals
+        table = AliasTable(weights)
+        return [ranked[rank] for rank in table.draws(n_parents, rng)]
+
+## Stochastic Universal Sampling Class ##
+class StochasticUniversal(object):
+    """Class to select parents by stochastic universal sampling.
+
+    Parents are drawn in proportion to how much better than the worst individual
+    they are, using a single random offset and evenly spaced pointers, so all the
+    parents of a generation are drawn in one linear pass.
+
+    Provides the following public methods:
+    select -- Draw the indexes of parents.
+    """
+    def select(self, fitnesses, maximize, n_parents, rng = None):
+        """Draw the indexes of parents, in random order.
+
+        Usage:
+        select(fitnesses, maximize, n_parents[, rng])
+
+        Parameters:
+        fitnesses -- A sequence with the fitness of every individual of the population.
+        maximize -- A boolean, true if higher fitnesses are better.
+        n_parents -- The number of indexes to draw.
+        rng -- A randomness.RNG to draw from. Defaults to the random module.
+        """
+        if n_parents <= 0:
+            return []
+        if maximize:
+            worst = min(fitnesses)
+            weights = [fitness - worst for fitness in fitnesses]
+        else:
+            worst = max(fitnesses)
+            weights = [worst - fitness for fitness in fitnesses]
+        total = sum(weights)
+        if not total > 0 or math.isinf(total):
+            weights = [1] * len(fitnesses)
+            total = len(fitnesses)
+        rng = rng or random
+        spacing = total / n_parents
+        pointer = rng.random() * spacing
+        selected = []
+        cumulative = 0
+        for index, weight in enumerate(weights):
+            cumulative += weight
+            while pointer < cumulative and len(selected) < n_parents:
+                selected.append(index)
+                pointer += spacing
+        while len(selected) < n_parents:
+            # Floating point error can leave the last pointer just past the end.
+            selected.append(len(weights) - 1)
+        rng.shuffle(selected)
+        return selected
+
+##### Functions #####
+### Partial Selection Functions ###
+def best(individuals, n_best, maximize = False, key = None):
+    """Return the n_best most fit individuals, most fit first, without sorting them all.
+
+    Usage:
+    best(individuals, n_best[, maximize, key])
+
+    Parameters:
+    individuals -- A list of individuals.
+    n_best -- The number of individuals to return.
+    maximize -- A boolean, true if higher fitnesses are better. Defaults to false.
+    key -- A function returning the value to rank an individual by. Defaults to its fitness attribute.
+    """
+    if n_best <= 0:
+        return []
+    if key is None:
+        key = operator.attrgetter("fitness")
+    if 4 * n_best >= len(individuals):
+        # A full sort is cheaper than a heap once a large fraction is wanted.
+        return sorted(individuals, key = key, reverse = maximize)[:n_best]
+    if maximize:
+        return heapq.nlargest(n_best, individuals, key = key)
+    return heapq.nsmallest(n_best, individuals, key = key)
@@ -3,6 +3,11 @@
 ##### Importing Modules #####
 ### Builtin Modules ###
 import math
+### Third Party Modules ###
+try:
+    import numpy
+except ImportError:
+    numpy = None
 ### Package Modules ###
 import genetic
 
@@ -27,3 +32,40 @@ class FitPoints(object):
     @staticmethod
     def dist(p1, p2):
         return math.sqrt((p1[0]-p2[0])**2 + (p1[1]-p2[1])**2)
+
+class TargetDistance(object):
+    # An objective that is additive over genes: the sum of the distances of
+    # each gene to its target. Its delta method lets the genetic module update
+    # a child's fitness from its parent's in time proportional to the number
+    # of genes that differ.
+    def __init__(self, targets):
+        self.targets = targets
+
+    def __call__(self, chromosome):
+        sum = 0
+        for gene, target in zip(chromosome, self.targets):
+            sum += abs(gene - target)
+        return sum
+
+    def delta(self, chromosome, parent_chromosome, parent_fitness, positions):
+        fitness = parent_fitness
+        for index in positions:
+            target = self.targets[index]
+            fitness += abs(chromosome[index] - target) - abs(parent_chromosome[index] - target)
+        return fitness
+
+class VectorFitPoints(FitPoints):
+    def __init__(self, points):
+        super().__init__(points)
+        self.xs = numpy.array([point[0] for point in points], dtype = float)
+        self.ys = numpy.array([point[1] for point in points], dtype = float)
+
+    def sum_of_squares(self, chromosomes):
+        chromosomes = numpy.asarray(chromosomes, dtype = float)
+        slopes = chromosomes[:, 0:1]
+        y_ints = chromosomes[:, 1:2]
+        return numpy.abs(slopes * self.xs + y_ints - self.ys).sum(axis = 1)
+
+    def evolve(self, *args, **kwargs):
+        kwargs["batch_fitness"] = True
+        super().evolve(*args, **kwargs)